@@ -1,6 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import os
+import json
+import time
+import hashlib
+import threading
 from dotenv import load_dotenv
 import logging
 
@@ -15,21 +19,222 @@ CORS(app)
 from utils.transcript_fetcher import TranscriptFetcher
 from utils.embeddings_manager import EmbeddingsManager
 from utils.chat_handler import ChatHandler
+from utils.video_store import VideoStore
+from utils.job_manager import JobManager
+from utils.ingestion import VideoIngestor
+from utils.vector_index import VectorIndex
+from utils.answer_cache import AnswerCache
+from utils.chat_sessions import SessionStore
+from utils.cache import DiskCache, LRUCache
+from utils.transcript_pages import TranscriptPages, negotiate_encoding, compress
+from utils.metrics import registry as metrics_registry, span, HTTP_REQUEST_SECONDS
+
+RETRIEVAL_MODES = ('semantic', 'hybrid', 'lexical')
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'hybrid')
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
 
 transcript_fetcher = TranscriptFetcher()
-embeddings_manager = EmbeddingsManager(api_key=os.getenv('OPENAI_API_KEY'))
+CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(DATA_DIR, 'embedding_cache.sqlite3'))
+
+embeddings_manager = EmbeddingsManager(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    cache_path=CACHE_PATH
+)
 chat_handler = ChatHandler(api_key=os.getenv('OPENAI_API_KEY'))
+DISK_CACHE_MAX_ROWS = int(os.getenv('DISK_CACHE_MAX_ROWS', 100000))
+answer_cache = AnswerCache(
+    max_size=int(os.getenv('ANSWER_CACHE_SIZE', 2048)),
+    ttl=float(os.getenv('ANSWER_CACHE_TTL', 86400)),
+    similarity=float(os.getenv('ANSWER_CACHE_SIMILARITY', 0.95)),
+    cache_path=CACHE_PATH,
+    disk_max_rows=DISK_CACHE_MAX_ROWS
+)
+CHAT_SESSION_TTL = float(os.getenv('CHAT_SESSION_TTL', 3600))
+chat_sessions = SessionStore(
+    max_sessions=int(os.getenv('CHAT_SESSION_LIMIT', 1000)),
+    ttl=CHAT_SESSION_TTL,
+    history_tokens=int(os.getenv('CHAT_HISTORY_TOKENS', 2000)),
+    model=chat_handler.chat_model,
+    # Shared by every worker process, so a conversation can continue on any of them
+    shared=DiskCache(
+        CACHE_PATH,
+        'chat_sessions',
+        encode=lambda value: json.dumps(value, default=float).encode('utf-8'),
+        decode=lambda data: json.loads(data),
+        ttl=CHAT_SESSION_TTL,
+        max_rows=DISK_CACHE_MAX_ROWS
+    ) if CACHE_PATH else None
+)
+CHAT_REUSE_CHUNKS = int(os.getenv('CHAT_REUSE_CHUNKS', 2))
+CHAT_REUSE_RATIO = float(os.getenv('CHAT_REUSE_RATIO', 0.5))
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+TRANSCRIPT_PAGE_SIZE = int(os.getenv('TRANSCRIPT_PAGE_SIZE', 50))
+TRANSCRIPT_MAX_PAGE_SIZE = int(os.getenv('TRANSCRIPT_MAX_PAGE_SIZE', 500))
+TRANSCRIPT_COMPRESS_MIN_BYTES = 1024
+
+# Paginated transcript views per video, and rendered (compressed) page bodies
+transcript_views = LRUCache(max_size=int(os.getenv('TRANSCRIPT_CACHE_SIZE', 64)))
+transcript_bodies = LRUCache(max_size=int(os.getenv('TRANSCRIPT_PAGE_CACHE_SIZE', 512)))
+
+video_store = VideoStore(
+    os.getenv('VIDEO_STORE_DIR', os.path.join(DATA_DIR, 'videos')),
+    storage=os.getenv('EMBEDDING_STORAGE', 'float32'),
+    memory_budget=int(float(os.getenv('VIDEO_STORE_MEMORY_MB', 1024)) * 1024 * 1024),
+    spill_directory=os.getenv('VIDEO_STORE_SPILL_DIR')
+)
+
+vector_index = VectorIndex(nprobe=int(os.getenv('ANN_NPROBE', 8)))
+
+vector_index_lock = threading.Lock()
+vector_index_signatures = {}
+vector_index_version = None
+
+def sync_vector_index():
+    """Index stored videos that are new or were rewritten, by this or any other worker.
+
+    Cheap when nothing changed: the store directory's modification time is
+    compared first. A sync already in progress is not waited for.
+    """
+    global vector_index_version
+    if not vector_index_lock.acquire(blocking=False):
+        return
+    try:
+        version = video_store.version()
+        if version is not None and version == vector_index_version:
+            return
+        vector_index_version = version
+        
+        indexed = 0
+        for video_id in video_store.video_ids():
+            signature = video_store.signature(video_id)
+            if video_id in vector_index and vector_index_signatures.get(video_id) == signature:
+                continue
+            video = video_store.get(video_id)
+            model = None if video is None else video['info'].get('embedding_model', embeddings_manager.embedding_model)
+            if model == embeddings_manager.embedding_model:
+                vector_index.add(video_id, video['embeddings'])
+                indexed += 1
+            vector_index_signatures[video_id] = signature
+        
+        if indexed:
+            logger.info(f"Vector index synced ({indexed} videos indexed): {vector_index.stats()}")
+    finally:
+        vector_index_lock.release()
 
-video_store = {}
+vector_index_thread = threading.Thread(target=sync_vector_index, name='vector-index', daemon=True)
+vector_index_thread.start()
+
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 3600))
+job_manager = JobManager(
+    max_workers=int(os.getenv('JOB_WORKERS', 4)),
+    retention=JOB_RETENTION_SECONDS,
+    shared=DiskCache(
+        CACHE_PATH,
+        'jobs',
+        encode=lambda value: json.dumps(value).encode('utf-8'),
+        decode=lambda data: json.loads(data),
+        ttl=JOB_RETENTION_SECONDS,
+        max_rows=DISK_CACHE_MAX_ROWS
+    ) if CACHE_PATH else None
+)
+video_ingestor = VideoIngestor(transcript_fetcher, embeddings_manager, video_store, vector_index, job_manager)
+
+def run_ingestion_job(job, video_id):
+    """Background job: ingest a video, reporting stage progress on the job"""
+    return video_ingestor.ingest(video_id, progress=job.update)
+
+def run_batch_ingestion_job(job, video_ids, concurrency):
+    """Background job: ingest many videos with shared embedding batches"""
+    return video_ingestor.ingest_many(video_ids, concurrency=concurrency, progress=job.update)
+
+def collect_metrics():
+    """Cache, store and session figures for /metrics, read from the components' own stats"""
+    caches = dict(
+        embeddings_manager.cache_stats(),
+        watch_pages=transcript_fetcher.watch_page_cache.stats(),
+        transcript_pages=transcript_bodies.stats()
+    )
+    answers = answer_cache.stats()
+    store = video_store.stats()
+    
+    def per_cache(key):
+        return [({'cache': name}, stats[key]) for name, stats in caches.items()]
+    
+    return [
+        ('youtube_twin_cache_hits_total', 'counter', 'Cache hits (memory tier)',
+         per_cache('hits') + [({'cache': 'chat_answers'}, answers['exact_hits'] + answers['semantic_hits'])]),
+        ('youtube_twin_cache_disk_hits_total', 'counter', 'Cache hits served from the shared disk tier',
+         per_cache('disk_hits')),
+        ('youtube_twin_cache_misses_total', 'counter', 'Cache misses',
+         per_cache('misses') + [({'cache': 'chat_answers'}, answers['misses'])]),
+        ('youtube_twin_cache_hit_ratio', 'gauge', 'Cache hit ratio since start',
+         per_cache('hit_rate') + [({'cache': 'chat_answers'}, answers['hit_rate'])]),
+        ('youtube_twin_cache_entries', 'gauge', 'Entries held in memory',
+         per_cache('size') + [({'cache': 'chat_answers'}, answers['size'])]),
+        ('youtube_twin_answer_cache_hits_total', 'counter', 'Chat answer cache hits by match type',
+         [({'match': 'exact'}, answers['exact_hits']), ({'match': 'semantic'}, answers['semantic_hits'])]),
+        ('youtube_twin_videos_loaded', 'gauge', 'Videos loaded in this process', [({}, store['videos_loaded'])]),
+        ('youtube_twin_embedding_bytes', 'gauge', 'Resident bytes of loaded embeddings', [({}, store['embedding_bytes'])]),
+        ('youtube_twin_video_store_resident_bytes', 'gauge', 'Approximate footprint of loaded videos',
+         [({}, store['resident_bytes'])]),
+        ('youtube_twin_video_store_evictions_total', 'counter', 'Videos evicted to stay within the memory budget',
+         [({}, store['evictions'])]),
+        ('youtube_twin_video_store_spills_total', 'counter', 'Evicted in-memory videos written to the spill directory',
+         [({}, store['spills'])]),
+        ('youtube_twin_vector_index_vectors', 'gauge', 'Vectors in the cross-video index', [({}, vector_index.stats()['vectors'])]),
+        ('youtube_twin_chat_sessions', 'gauge', 'Active chat sessions', [({}, chat_sessions.stats()['sessions'])])
+    ]
+
+metrics_registry.add_collector(collect_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe request latency per route (time to the first byte for streamed responses)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            status=response.status_code
+        )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: stage timings, request latency, OpenAI usage, cache hit rates"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "YouTube Twin API is running"}), 200
+    return jsonify({
+        "status": "healthy",
+        "message": "YouTube Twin API is running",
+        "embedding_model": embeddings_manager.embedding_model,
+        "caches": dict(embeddings_manager.cache_stats(), answers=answer_cache.stats()),
+        "video_store": video_store.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "vector_index": vector_index.stats()
+    }), 200
 
 @app.route('/api/process-video', methods=['POST'])
 def process_video():
-    """Process a YouTube video and create embeddings"""
+    """Start processing a YouTube video in the background.
+
+    Returns 202 with a job id to poll at /api/jobs/<job_id>. Pass
+    "wait": true to block until processing has finished instead.
+    """
     try:
         data = request.json
         video_url = data.get('video_url')
@@ -53,89 +258,419 @@ def process_video():
                 "video_info": video_store[video_id]['info']
             }), 200
         
-        availability = transcript_fetcher.check_transcript_availability(video_id)
-        if not availability['available']:
-            error_detail = availability.get('error', 'Unknown error')
-            logger.error(f"Transcript not available for {video_id}: {error_detail}")
+        job, created = job_manager.submit(video_id, run_ingestion_job, video_id)
+        
+        if data.get('wait'):
+            job.wait()
+            if job.status == 'failed':
+                return jsonify({
+                    "error": job.error,
+                    "details": job.details,
+                    "video_id": video_id
+                }), 500 if job.unexpected_error else 400
+            
             return jsonify({
-                "error": "Transcript not available for this video",
-                "details": "This video may not have captions enabled, may be private/restricted, or may have transcript access disabled by the creator.",
-                "video_id": video_id
-            }), 400
+                "message": "Video processed successfully",
+                **job.result
+            }), 200
+        
+        return jsonify({
+            "message": "Video processing started" if created else "Video is already being processed",
+            "video_id": video_id,
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}"
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error processing video: {str(e)}", exc_info=True)
+        return jsonify({
+            "error": "Internal server error",
+            "details": str(e)
+        }), 500
+
+@app.route('/api/process-videos', methods=['POST'])
+def process_videos():
+    """Start processing a list of YouTube videos (URLs or IDs) as one batch job"""
+    try:
+        data = request.json
+        video_urls = data.get('video_urls')
         
-        logger.info(f"Available transcript languages for {video_id}: {availability['languages']}")
+        if not video_urls or not isinstance(video_urls, list):
+            return jsonify({"error": "video_urls must be a non-empty list"}), 400
         
-        transcript_data = transcript_fetcher.fetch_transcript(video_id)
-        if not transcript_data:
-            return jsonify({
-                "error": "Could not fetch transcript",
-                "details": "The video transcript could not be retrieved. Please ensure the video has captions/subtitles available.",
-                "video_id": video_id
-            }), 400
+        max_batch = int(os.getenv('BATCH_MAX_VIDEOS', 500))
+        if len(video_urls) > max_batch:
+            return jsonify({"error": f"At most {max_batch} videos can be processed per batch"}), 400
+        
+        video_ids = []
+        invalid = []
+        for video_url in video_urls:
+            video_id = transcript_fetcher.extract_video_id(str(video_url))
+            if video_id:
+                video_ids.append(video_id)
+            else:
+                invalid.append(video_url)
+        
+        if not video_ids:
+            return jsonify({"error": "No valid YouTube URLs", "invalid": invalid}), 400
         
-        chunks_with_embeddings = embeddings_manager.create_embeddings(transcript_data)
+        try:
+            concurrency = int(data.get('concurrency', os.getenv('BATCH_CONCURRENCY', 4)))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({"error": "concurrency must be an integer"}), 400
+        concurrency = max(1, min(concurrency, int(os.getenv('BATCH_MAX_CONCURRENCY', 16))))
         
-        video_store[video_id] = {
-            'info': transcript_data['info'],
-            'chunks': chunks_with_embeddings
-        }
+        batch_key = 'batch:' + hashlib.sha1(','.join(sorted(set(video_ids))).encode('utf-8')).hexdigest()
+        job, created = job_manager.submit(batch_key, run_batch_ingestion_job, video_ids, concurrency)
         
-        logger.info(f"Successfully processed video {video_id} with {len(chunks_with_embeddings)} chunks")
+        logger.info(f"Batch of {len(video_ids)} videos submitted as job {job.id}")
+        
+        if data.get('wait'):
+            job.wait()
+            if job.status == 'failed':
+                return jsonify({"error": job.error, "details": job.details}), 500
+            return jsonify({**job.result, "invalid": invalid}), 200
         
         return jsonify({
-            "message": "Video processed successfully",
-            "video_id": video_id,
-            "video_info": transcript_data['info'],
-            "chunks_count": len(chunks_with_embeddings)
-        }), 200
+            "message": "Batch processing started" if created else "Batch is already being processed",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "videos": len(video_ids),
+            "invalid": invalid
+        }), 202
         
     except Exception as e:
-        logger.error(f"Error processing video: {str(e)}", exc_info=True)
+        logger.error(f"Error processing videos: {str(e)}", exc_info=True)
         return jsonify({
             "error": "Internal server error",
             "details": str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report status and stage-level progress of a processing job"""
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify(status), 200
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Chat with the video content"""
+    """Chat with the video content.
+
+    Pass the returned ``session_id`` back to continue the conversation; the
+    server keeps a token-budgeted history per session and video.
+    """
     try:
-        data = request.json
-        video_id = data.get('video_id')
-        message = data.get('message')
+        chat = prepare_chat(request.json)
         
-        if not video_id or not message:
-            return jsonify({"error": "video_id and message are required"}), 400
+        response = chat['cached']
+        if response is None:
+            response = chat_handler.generate_response(
+                chat['message'],
+                chat['relevant_chunks'],
+                chat['video']['info'],
+                history=chat['history']
+            )
         
-        if video_id not in video_store:
-            return jsonify({"error": "Video not found. Please process the video first."}), 404
+        finish_chat(chat, response['answer'], response['sources'])
         
-        logger.info(f"Chat query for video {video_id}: {message}")
+        return jsonify(chat_result(chat, response)), 200
         
-        relevant_chunks = embeddings_manager.find_relevant_chunks(
-            message,
-            video_store[video_id]['chunks'],
-            top_k=5
+    except ChatRequestError as e:
+        return jsonify({"error": e.error}), e.status
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chat with the video content, streaming the answer as Server-Sent Events.
+
+    Emits a 'sources' event first (with the ``session_id``), then 'delta'
+    events with answer tokens, and finally 'done' (or 'error' if generation
+    fails mid-stream). A cached answer is sent as a single delta; 'done'
+    carries the cache indicators.
+    """
+    try:
+        chat = prepare_chat(request.json, streaming=True)
+        
+        def generate():
+            if chat['cached'] is not None:
+                yield from cached_stream_events(chat)
+                return
+            
+            try:
+                state = {'sources': [], 'answer_parts': []}
+                events = chat_handler.stream_response(
+                    chat['message'], chat['relevant_chunks'], chat['video']['info'], history=chat['history']
+                )
+                for event in events:
+                    yield stream_event(chat, event, state)
+            except Exception as e:
+                logger.error(f"Error in chat stream: {str(e)}")
+                yield format_sse('error', {"error": str(e)})
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
         )
         
-        response = chat_handler.generate_response(
+    except ChatRequestError as e:
+        return jsonify({"error": e.error}), e.status
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/chat/sessions/<session_id>', methods=['GET', 'DELETE'])
+def chat_session(session_id):
+    """Get the history of a chat session for a video, or delete the session"""
+    if request.method == 'DELETE':
+        if not chat_sessions.delete(session_id):
+            return jsonify({"error": "Session not found"}), 404
+        return jsonify({"message": "Session deleted", "session_id": session_id}), 200
+    
+    session = chat_sessions.get(session_id, request.args.get('video_id'))
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(session.to_dict()), 200
+
+class ChatRequestError(Exception):
+    """A chat request that cannot be served, with the HTTP status to answer with"""
+    
+    def __init__(self, error, status):
+        super().__init__(error)
+        self.error = error
+        self.status = status
+
+def prepare_chat(data, streaming=False):
+    """Validate a chat request and gather everything needed to answer it.
+
+    Shared by the Flask routes and the async routes in asgi.py. Looks up
+    the session, its history and the retrieved chunks, and on the first
+    turn of a session a cached answer. Raises ChatRequestError for
+    invalid requests.
+    """
+    data = data or {}
+    video_id = data.get('video_id')
+    message = data.get('message')
+    
+    if not video_id or not message:
+        raise ChatRequestError("video_id and message are required", 400)
+    
+    if video_id not in video_store:
+        raise ChatRequestError("Video not found. Please process the video first.", 404)
+    
+    logger.info(f"{'Streaming chat' if streaming else 'Chat'} query for video {video_id}: {message}")
+    
+    video = video_store[video_id]
+    session, _ = chat_sessions.get_or_create(data.get('session_id'), video_id)
+    history = session.history()
+    relevant_chunks = retrieve_chat_context(video, message, session)
+    
+    cached, cache_match, query_embedding = None, None, None
+    if not history['turns']:
+        cached, cache_match, query_embedding = lookup_cached_answer(video_id, message, relevant_chunks)
+    
+    return {
+        'video_id': video_id,
+        'message': message,
+        'video': video,
+        'session': session,
+        'history': history,
+        'relevant_chunks': relevant_chunks,
+        'cached': cached,
+        'cache_match': cache_match,
+        'query_embedding': query_embedding
+    }
+
+def finish_chat(chat, answer, sources):
+    """Record the answered turn and cache a freshly generated first-turn answer"""
+    record_chat_turn(chat['session'], chat['message'], answer, chat['relevant_chunks'])
+    if chat['cached'] is None and not chat['history']['turns']:
+        answer_cache.set(
+            chat['video_id'], chat['message'], chat_handler.chat_model, chat['relevant_chunks'],
+            {"answer": answer, "sources": sources}, chat['query_embedding']
+        )
+
+def chat_result(chat, response):
+    """JSON body of a chat response"""
+    return {
+        "response": response['answer'],
+        "sources": response['sources'],
+        "session_id": chat['session'].id,
+        "cached": chat['cache_match'] is not None,
+        "cache_match": chat['cache_match'],
+        "usage": response.get('usage')
+    }
+
+def cached_stream_events(chat):
+    """SSE messages replaying a cached answer"""
+    cached = chat['cached']
+    finish_chat(chat, cached['answer'], cached['sources'])
+    return [
+        format_sse('sources', {"sources": cached['sources'], "session_id": chat['session'].id}),
+        format_sse('delta', {"content": cached['answer']}),
+        format_sse('done', {"cached": True, "cache_match": chat['cache_match'], "usage": None})
+    ]
+
+def stream_event(chat, event, state):
+    """Format one ChatHandler stream event as SSE, finishing the chat on 'done'"""
+    event_type = event.pop('type')
+    if event_type == 'sources':
+        state['sources'] = event['sources']
+        event['session_id'] = chat['session'].id
+    elif event_type == 'delta':
+        state['answer_parts'].append(event['content'])
+    elif event_type == 'done':
+        finish_chat(chat, ''.join(state['answer_parts']), state['sources'])
+        event.update(cached=False, cache_match=None)
+    return format_sse(event_type, event)
+
+def retrieve_chat_context(video, message, session):
+    """Retrieve chunks for a chat message, carrying over relevant chunks from the previous turn.
+
+    Follow-up questions often refer back to what was just discussed without
+    repeating its keywords, so up to CHAT_REUSE_CHUNKS chunks from the last
+    turn that were not retrieved again are kept, as long as they score at
+    least CHAT_REUSE_RATIO of the best new chunk against the new message.
+    """
+    with span('retrieval'):
+        relevant_chunks = embeddings_manager.find_relevant_chunks(
             message,
-            relevant_chunks,
-            video_store[video_id]['info']
+            video['chunks'],
+            video['embeddings'],
+            top_k=5,
+            lexical_index=video.get('lexical_index'),
+            mode=RETRIEVAL_MODE
         )
+    
+    retrieved = {chunk['start'] for chunk in relevant_chunks}
+    previous = [chunk for chunk in session.previous_chunks() if chunk['start'] not in retrieved]
+    if not previous or CHAT_REUSE_CHUNKS <= 0:
+        return relevant_chunks
+    
+    positions = {chunk['start']: i for i, chunk in enumerate(video['chunks'])}
+    previous = [chunk for chunk in previous if chunk['start'] in positions][:CHAT_REUSE_CHUNKS]
+    
+    scores = None
+    if RETRIEVAL_MODE != 'lexical':
+        scores = embeddings_manager.score_chunks(
+            message, video['embeddings'], [positions[chunk['start']] for chunk in previous]
+        )
+    best = max((chunk.get('similarity', 0.0) for chunk in relevant_chunks), default=0.0)
+    
+    for i, chunk in enumerate(previous):
+        score = chunk.get('similarity', 0.0) if scores is None else float(scores[i])
+        if scores is None or score >= CHAT_REUSE_RATIO * best:
+            relevant_chunks.append(dict(chunk, similarity=score, carried_over=True))
+    
+    return relevant_chunks
+
+def record_chat_turn(session, message, answer, relevant_chunks):
+    """Add a finished turn to the session and summarize old turns if over budget"""
+    session.add_turn(message, answer, [chunk for chunk in relevant_chunks if not chunk.get('carried_over')])
+    chat_sessions.maybe_compact(session, chat_handler.summarize_history)
+
+def lookup_cached_answer(video_id, message, relevant_chunks):
+    """Look up a cached answer; returns (response or None, cache match, query embedding)"""
+    query_embedding = None
+    if RETRIEVAL_MODE != 'lexical':
+        query_embedding = embeddings_manager.get_query_embedding(message)
+    
+    response, cache_match = answer_cache.get(
+        video_id, message, chat_handler.chat_model, relevant_chunks, query_embedding
+    )
+    return response, cache_match, query_embedding
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/search-videos', methods=['POST'])
+def search_videos():
+    """Semantic search across all processed videos"""
+    try:
+        data = request.json
+        query = data.get('query')
+        top_k = int(data.get('top_k', 10))
+        video_ids = data.get('video_ids')
+        
+        if not query:
+            return jsonify({"error": "query is required"}), 400
+        
+        if video_ids is not None and not isinstance(video_ids, list):
+            return jsonify({"error": "video_ids must be a list"}), 400
+        
+        sync_vector_index()
+        query_embedding = embeddings_manager.get_query_embedding(query)
+        hits = vector_index.search(query_embedding, top_k=top_k, video_ids=video_ids)
+        
+        results = []
+        videos = {}
+        for video_id, chunk_index, similarity in hits:
+            video = video_store.get(video_id)
+            if video is None:
+                continue
+            chunk = video['chunks'][chunk_index]
+            
+            results.append({
+                'video_id': video_id,
+                'title': video['info'].get('title'),
+                'text': chunk['text'],
+                'start': chunk['start'],
+                'duration': chunk['duration'],
+                'similarity': similarity
+            })
+            
+            summary = videos.setdefault(video_id, {
+                'video_id': video_id,
+                'title': video['info'].get('title'),
+                'video_url': video['info'].get('video_url'),
+                'best_similarity': similarity,
+                'matches': 0
+            })
+            summary['matches'] += 1
         
         return jsonify({
-            "response": response['answer'],
-            "sources": response['sources']
+            "results": results,
+            "videos": list(videos.values())
         }), 200
         
     except Exception as e:
-        logger.error(f"Error in chat: {str(e)}")
+        logger.error(f"Error searching videos: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/transcript/<video_id>', methods=['GET'])
+def transcript_page(video_id):
+    """Get one page of a transcript with timestamps.
+
+    Query parameters: ``cursor`` (the previous page's ``next_cursor``),
+    ``limit`` (chunks per page) and an optional ``start``/``end`` time range
+    in seconds. Pages carry strong ETags, so a repeat load with
+    If-None-Match returns 304.
+    """
+    try:
+        pages = transcript_pages(video_id)
+        if pages is None:
+            return jsonify({"error": "Video not found. Please process the video first."}), 404
+        
+        try:
+            page = parse_transcript_page(request.args, TRANSCRIPT_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return transcript_response(pages, pages.page(**page))
+        
+    except Exception as e:
+        logger.error(f"Error getting transcript: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/get-transcript', methods=['POST'])
 def get_transcript():
-    """Get full transcript with timestamps"""
+    """Get the transcript with timestamps (all of it unless cursor/limit/start/end are given)"""
     try:
         data = request.json
         video_id = data.get('video_id')
@@ -143,45 +678,113 @@ def get_transcript():
         if not video_id:
             return jsonify({"error": "video_id is required"}), 400
         
-        if video_id not in video_store:
+        pages = transcript_pages(video_id)
+        if pages is None:
             return jsonify({"error": "Video not found. Please process the video first."}), 404
         
-        chunks = video_store[video_id]['chunks']
-        transcript = [{
-            'text': chunk['text'],
-            'start': chunk['start'],
-            'duration': chunk['duration']
-        } for chunk in chunks]
+        try:
+            page = parse_transcript_page(data, None)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        return jsonify({
-            "video_info": video_store[video_id]['info'],
-            "transcript": transcript
-        }), 200
+        return transcript_response(pages, pages.page(**page))
         
     except Exception as e:
         logger.error(f"Error getting transcript: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def transcript_pages(video_id):
+    """Paginated view of a video's transcript, rebuilt only when its record is replaced"""
+    video = video_store.get(video_id)
+    if video is None:
+        return None
+    
+    revision = video_store.revision(video_id)
+    pages = transcript_views.get(video_id)
+    if pages is None or pages.revision != revision:
+        pages = TranscriptPages(video_id, video, revision)
+        transcript_views.set(video_id, pages)
+    return pages
+
+def parse_transcript_page(params, default_limit):
+    """Read cursor, limit, start and end from query or JSON parameters"""
+    def number(name, convert):
+        value = params.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number")
+    
+    cursor = number('cursor', int) or 0
+    limit = number('limit', int)
+    if limit is None:
+        limit = default_limit
+    start = number('start', float)
+    end = number('end', float)
+    
+    if cursor < 0:
+        raise ValueError("cursor must not be negative")
+    if limit is not None and not 1 <= limit <= TRANSCRIPT_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {TRANSCRIPT_MAX_PAGE_SIZE}")
+    
+    return {'cursor': cursor, 'limit': limit, 'start': start, 'end': end}
+
+def transcript_response(pages, page):
+    """Serve a transcript page from the rendered-body cache, compressed when the client accepts it"""
+    first, stop, next_cursor = page
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    key = (pages.version, first, stop, next_cursor, encoding)
+    
+    cached = transcript_bodies.get(key)
+    if cached is None:
+        body = pages.render(first, stop, next_cursor)
+        if encoding and len(body) >= TRANSCRIPT_COMPRESS_MIN_BYTES:
+            body = compress(body, encoding)
+        else:
+            encoding = None
+        cached = (body, encoding)
+        transcript_bodies.set(key, cached)
+    body, encoding = cached
+    
+    response = Response(body, mimetype='application/json')
+    response.set_etag(pages.etag(first, stop, next_cursor, encoding))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response.make_conditional(request)
+
 @app.route('/api/search-transcript', methods=['POST'])
 def search_transcript():
-    """Semantic search within transcript"""
+    """Search within a transcript ('semantic', 'hybrid' or network-free 'lexical' mode)"""
     try:
         data = request.json
         video_id = data.get('video_id')
         query = data.get('query')
         top_k = data.get('top_k', 3)
+        mode = data.get('mode', RETRIEVAL_MODE)
         
         if not video_id or not query:
             return jsonify({"error": "video_id and query are required"}), 400
         
+        if mode not in RETRIEVAL_MODES:
+            return jsonify({"error": f"mode must be one of: {', '.join(RETRIEVAL_MODES)}"}), 400
+        
         if video_id not in video_store:
             return jsonify({"error": "Video not found. Please process the video first."}), 404
         
-        relevant_chunks = embeddings_manager.find_relevant_chunks(
-            query,
-            video_store[video_id]['chunks'],
-            top_k=top_k
-        )
+        video = video_store[video_id]
+        with span('retrieval'):
+            relevant_chunks = embeddings_manager.find_relevant_chunks(
+                query,
+                video['chunks'],
+                video['embeddings'],
+                top_k=top_k,
+                lexical_index=video.get('lexical_index'),
+                mode=mode
+            )
         
         results = [{
             'text': chunk['text'],
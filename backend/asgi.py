@@ -0,0 +1,251 @@
+"""ASGI entrypoint: async chat on top of the Flask app.
+
+Run with ``uvicorn asgi:app --host 0.0.0.0 --port 5000``. The chat routes
+are served natively with AsyncOpenAI on a pooled connection, so a single
+process holds hundreds of in-flight answers without a thread each. Every
+other route goes to the Flask app in ``app.py`` through a small WSGI
+bridge on a bounded thread pool; ingestion already runs on the job
+manager's own threads. Chat preparation (session lookup, retrieval and the
+blocking query-embedding request) runs on its own pool of
+ASGI_CHAT_THREADS threads, so slow embedding calls neither queue behind
+anyio's default limiter nor take threads from the Flask routes.
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+from urllib.parse import unquote
+
+import anyio
+import anyio.to_thread
+
+import app as flask_app
+from app import (
+    chat_handler, prepare_chat, finish_chat, chat_result, cached_stream_events,
+    stream_event, format_sse, ChatRequestError, SSE_HEADERS
+)
+from utils.metrics import HTTP_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 40))
+CHAT_THREADS = int(os.getenv('ASGI_CHAT_THREADS', 64))
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+
+
+class App:
+    """ASGI application routing chat natively and everything else to Flask"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.routes = {
+            '/api/chat': self.chat,
+            '/api/chat/stream': self.chat_stream
+        }
+        self._limiter = None
+        self._chat_limiter = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        route = self.routes.get(scope['path'])
+        if route is not None and scope['method'] == 'POST':
+            await route(scope, receive, self._timed_send(scope, send))
+        else:
+            await self.wsgi(scope, receive, send)
+
+    @staticmethod
+    def _timed_send(scope, send):
+        """Wrap send to observe request latency when the response starts, as the Flask hook does"""
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, method=scope['method'], route=scope['path'], status=message['status']
+                )
+            await send(message)
+
+        return timed_send
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await chat_handler.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def chat(self, scope, receive, send):
+        """Async /api/chat, same contract as the Flask route"""
+        try:
+            chat = await self._prepare(receive)
+
+            response = chat['cached']
+            if response is None:
+                response = await chat_handler.agenerate_response(
+                    chat['message'],
+                    chat['relevant_chunks'],
+                    chat['video']['info'],
+                    history=chat['history']
+                )
+
+            await anyio.to_thread.run_sync(finish_chat, chat, response['answer'], response['sources'])
+
+            await self._send_json(send, 200, chat_result(chat, response))
+
+        except ChatRequestError as e:
+            await self._send_json(send, e.status, {"error": e.error})
+        except Exception as e:
+            logger.error(f"Error in chat: {str(e)}")
+            await self._send_json(send, 500, {"error": str(e)})
+
+    async def chat_stream(self, scope, receive, send):
+        """Async /api/chat/stream, same Server-Sent Events as the Flask route"""
+        try:
+            chat = await self._prepare(receive, streaming=True)
+        except ChatRequestError as e:
+            await self._send_json(send, e.status, {"error": e.error})
+            return
+        except Exception as e:
+            logger.error(f"Error in chat: {str(e)}")
+            await self._send_json(send, 500, {"error": str(e)})
+            return
+
+        headers = [(b'content-type', b'text/event-stream')] + CORS_HEADERS + [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in SSE_HEADERS.items()
+        ]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+        async def emit(message):
+            await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+
+        events = None
+        try:
+            if chat['cached'] is not None:
+                for message in await anyio.to_thread.run_sync(cached_stream_events, chat):
+                    await emit(message)
+            else:
+                state = {'sources': [], 'answer_parts': []}
+                events = chat_handler.astream_response(
+                    chat['message'], chat['relevant_chunks'], chat['video']['info'], history=chat['history']
+                )
+                async for event in events:
+                    if event['type'] == 'done':
+                        message = await anyio.to_thread.run_sync(stream_event, chat, event, state)
+                    else:
+                        message = stream_event(chat, event, state)
+                    await emit(message)
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            await emit(format_sse('error', {"error": str(e)}))
+        finally:
+            # Close the upstream stream now, not when the generator is collected,
+            # if the client went away or emitting failed mid-answer
+            if events is not None:
+                await events.aclose()
+
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def wsgi(self, scope, receive, send):
+        """Serve a request with the Flask app on a worker thread"""
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(WSGI_THREADS)
+
+        body = await self._read_body(receive)
+        status, headers, chunks = await anyio.to_thread.run_sync(
+            self._call_wsgi, self._environ(scope, body), limiter=self._limiter
+        )
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    def _call_wsgi(self, environ):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks = list(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], chunks
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': unquote(scope['path']),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def _prepare(self, receive, streaming=False):
+        body = await self._read_body(receive)
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            raise ChatRequestError("Request body must be JSON", 400)
+
+        if self._chat_limiter is None:
+            self._chat_limiter = anyio.CapacityLimiter(CHAT_THREADS)
+        return await anyio.to_thread.run_sync(prepare_chat, data, streaming, limiter=self._chat_limiter)
+
+    @staticmethod
+    async def _read_body(receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    @staticmethod
+    async def _send_json(send, status, data):
+        body = json.dumps(data).encode('utf-8')
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers + CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+app = App(flask_app.app)
@@ -0,0 +1,193 @@
+"""
+Caption parsing benchmark
+
+Compares the streaming caption parsers (utils/captions.py) with the
+previous approach of loading the whole payload (json.loads /
+ET.fromstring) into a full entry list before chunking. Synthetic
+auto-caption files of the requested size are generated in json3 and XML
+format; parse plus chunk time and peak Python memory (tracemalloc) are
+reported for both, and the resulting chunks are checked to be identical.
+Streaming is about memory: expect similar times, with XML sometimes slower
+than ET.fromstring, especially on small files. Each run first checks that
+payloads cut off mid-event or right before their closing bracket/tag raise
+a parse error instead of passing for a whole (shorter) transcript.
+
+    python benchmarks/caption_parsing.py
+    python benchmarks/caption_parsing.py --size-mb 2 8 --repeat 5
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.captions import iter_caption_entries
+from utils.transcript_fetcher import TranscriptFetcher
+
+WORDS = (
+    "so today we're going to talk about how neural networks learn and why gradient descent "
+    "works it's a bit like rolling a ball down a hill & the ball doesn't know where it's going "
+    "but it always moves towards lower ground <i>mostly</i> okay let's look at an example"
+).split()
+
+def generate_json3(size_bytes, seed=0):
+    """Auto-caption style json3: one event per word group, each word a seg"""
+    rng = random.Random(seed)
+    events = []
+    total = 0
+    start_ms = 0
+    while total < size_bytes:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 8))]
+        event = {
+            'tStartMs': start_ms,
+            'dDurationMs': 2400,
+            'wWinId': 1,
+            'segs': [{'utf8': (' ' if i else '') + word, 'tOffsetMs': i * 300, 'acAsrConf': 0}
+                     for i, word in enumerate(words)]
+        }
+        encoded = json.dumps(event)
+        events.append(encoded)
+        total += len(encoded) + 1
+        start_ms += 2000
+    return ('{"wireMagic":"pb3","pens":[{}],"events":[' + ','.join(events) + ']}').encode('utf-8')
+
+def generate_xml(size_bytes, seed=0):
+    """Classic timedtext XML with double-escaped entities"""
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+    total = len(parts[0])
+    start = 0.0
+    while total < size_bytes:
+        text = escape(escape(' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))))
+        part = f'<text start="{start:.2f}" dur="2.4">{text}</text>'
+        parts.append(part)
+        total += len(part)
+        start += 2.0
+    parts.append('</transcript>')
+    return ''.join(parts).encode('utf-8')
+
+def legacy_parse_json3(data):
+    """The previous parser: whole document in memory, full entry list"""
+    caption_json = json.loads(data)
+    transcript_list = []
+    for event in caption_json.get('events', []):
+        segs = event.get('segs')
+        if not segs:
+            continue
+        text = ''.join([seg.get('utf8', '') for seg in segs]).strip()
+        if text:
+            transcript_list.append({
+                'text': text,
+                'start': event.get('tStartMs', 0) / 1000.0,
+                'duration': event.get('dDurationMs', 0) / 1000.0
+            })
+    return transcript_list
+
+def legacy_parse_xml(data):
+    """The previous parser: ET.fromstring plus chained replaces and a regex per entry"""
+    root = ET.fromstring(data)
+    transcript_list = []
+    for text_elem in root.findall('.//text'):
+        text = text_elem.text or ''
+        text = text.replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+        text = text.replace('&#39;', "'").replace('&quot;', '"')
+        text = re.sub(r'<[^>]+>', '', text)
+        text = text.strip()
+        if text:
+            transcript_list.append({
+                'text': text,
+                'start': float(text_elem.get('start', 0)),
+                'duration': float(text_elem.get('dur', 0))
+            })
+    return transcript_list
+
+def truncations(fmt, data):
+    """Cut points: mid-file, after the first complete entry and just before the closing bracket/tag"""
+    if fmt == 'json3':
+        first_end = data.index(b'},{') + 2
+        closing = data.rindex(b']')
+    else:
+        first_end = data.index(b'</text>') + len(b'</text>')
+        closing = data.rindex(b'</transcript>')
+    return {'mid-entry': data[:len(data) // 2], 'after first entry': data[:first_end], 'before closing': data[:closing]}
+
+def check_truncation(fmt, data, read_size=4096):
+    """Truncated payloads must raise, whole or fed in chunks; returns the cases that did not"""
+    failures = []
+    logging.disable(logging.ERROR)
+    try:
+        for name, cut in truncations(fmt, data).items():
+            for label, payload in (('whole', cut), ('chunked', [cut[i:i + read_size] for i in range(0, len(cut), read_size)])):
+                try:
+                    list(iter_caption_entries(payload))
+                except (json.JSONDecodeError, ET.ParseError):
+                    continue
+                failures.append(f"{name} ({label})")
+    finally:
+        logging.disable(logging.NOTSET)
+    return failures
+
+def measure(fn, repeat):
+    """Best wall time over ``repeat`` runs, then peak traced memory of one run"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, nargs='+', default=[2, 8], help='Caption file sizes to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    fetcher = TranscriptFetcher()
+    chunk = fetcher._create_chunks_with_timestamps
+    legacy = {'json3': legacy_parse_json3, 'xml': legacy_parse_xml}
+    generators = {'json3': generate_json3, 'xml': generate_xml}
+
+    for fmt, generate in generators.items():
+        failures = check_truncation(fmt, generate(64 * 1024))
+        if failures:
+            print(f"warning: truncated {fmt} parsed without error: {', '.join(failures)}")
+        else:
+            print(f"truncated {fmt} payloads raise: ok")
+    print()
+
+    print(f"{'format':<8}{'size':>8}{'pipeline':>12}{'time':>10}{'peak mem':>12}{'chunks':>8}")
+    for size_mb in args.size_mb:
+        for fmt, generate in generators.items():
+            data = generate(int(size_mb * 1024 * 1024))
+
+            results = {}
+            for name, fn in (
+                ('full', lambda: chunk(legacy[fmt](data))),
+                ('streaming', lambda: chunk(iter_caption_entries(data)))
+            ):
+                chunks, seconds, peak = measure(fn, args.repeat)
+                results[name] = chunks
+                print(f"{fmt:<8}{len(data) / 1e6:>7.1f}M{name:>12}{seconds * 1000:>8.0f}ms"
+                      f"{peak / 1e6:>10.1f}MB{len(chunks):>8}")
+
+            if results['full'] != results['streaming']:
+                print(f"  warning: {fmt} chunks differ between pipelines")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Transcript chunking benchmark
+
+Compares the chunker in utils/transcript_fetcher.py with the previous one,
+which grew chunk text by string concatenation and looked for overlap in
+the last five entries only. Synthetic word-level auto-captions (a few
+tenths of a second per entry, with occasional sentence ends and pauses)
+are chunked at increasing lengths; time per entry should stay flat as the
+transcript grows. Also reported: the mean overlap each pipeline actually
+carried into the next chunk, compared with CHUNK_OVERLAP, and the share of
+chunks that end on a sentence end or a pause. 'exact' is the default
+chunker; 'snapped' enables the opt-in CHUNK_SNAP_SLACK boundary snapping.
+
+    python benchmarks/chunking.py
+    python benchmarks/chunking.py --entries 10000 40000 160000 --repeat 5 --snap-slack 5
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import deque
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.transcript_fetcher import TranscriptFetcher
+
+WORDS = (
+    "so today we're going to talk about how neural networks learn and why gradient descent "
+    "works it's a bit like rolling a ball down a hill the ball doesn't know where it's going "
+    "but it always moves towards lower ground okay let's look at an example"
+).split()
+
+def generate_entries(count, seed=0):
+    """Dense auto-caption entries: one or two words each, sentences of 8-30 words"""
+    rng = random.Random(seed)
+    entries = []
+    start = 0.0
+    until_sentence_end = rng.randint(8, 30)
+    for _ in range(count):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 2)))
+        duration = rng.uniform(0.2, 0.6)
+        until_sentence_end -= 1
+        if until_sentence_end <= 0:
+            text += rng.choice('.?!')
+            until_sentence_end = rng.randint(8, 30)
+            duration += rng.choice((0.0, 0.0, 1.8))
+        entries.append({'text': text, 'start': start, 'duration': duration})
+        start += duration
+    return entries
+
+def legacy_chunks(fetcher, transcript_entries):
+    """The previous chunker: text grown with +=, overlap from the last five entries"""
+    chunks = []
+    recent = deque(maxlen=5)
+    current_chunk = {'text': '', 'start': 0, 'end': 0, 'duration': 0}
+
+    for entry in transcript_entries:
+        text = entry['text']
+        start = entry['start']
+        duration = entry['duration']
+
+        if not current_chunk['text']:
+            current_chunk['start'] = start
+            current_chunk['text'] = text
+            current_chunk['end'] = start + duration
+        else:
+            if current_chunk['end'] - current_chunk['start'] >= fetcher.chunk_duration:
+                current_chunk['duration'] = current_chunk['end'] - current_chunk['start']
+                chunks.append(current_chunk.copy())
+
+                overlap_start = current_chunk['end'] - fetcher.chunk_overlap
+                overlap_text = ' '.join(e['text'] for e in recent if e['start'] >= overlap_start)
+
+                current_chunk = {
+                    'text': overlap_text + ' ' + text if overlap_text else text,
+                    'start': overlap_start if overlap_text else start,
+                    'end': start + duration
+                }
+            else:
+                current_chunk['text'] += ' ' + text
+                current_chunk['end'] = start + duration
+
+        recent.append(entry)
+
+    if current_chunk['text']:
+        current_chunk['duration'] = current_chunk['end'] - current_chunk['start']
+        chunks.append(current_chunk)
+    return chunks
+
+def entry_index(entries):
+    """Map each entry's end time to its position, to find where a chunk ends"""
+    return {round(entry['start'] + entry['duration'], 6): i for i, entry in enumerate(entries)}
+
+def mean_overlap(chunks, entries, ends):
+    """Mean seconds of captions repeated at the start of the following chunk"""
+    overlaps = []
+    for previous, chunk in zip(chunks, chunks[1:]):
+        i = ends.get(round(previous['end'], 6))
+        shared = _shared_words(previous['text'], chunk['text'])
+        if i is None or not shared:
+            overlaps.append(0.0)
+            continue
+        j = i
+        while j > 0 and shared > len(entries[j]['text'].split()):
+            shared -= len(entries[j]['text'].split())
+            j -= 1
+        overlaps.append(previous['end'] - entries[j]['start'])
+    return sum(overlaps) / len(overlaps) if overlaps else 0.0
+
+def _shared_words(text, following):
+    words = text.split()
+    next_words = following.split()
+    for size in range(min(len(words), len(next_words)), 0, -1):
+        if words[-size:] == next_words[:size]:
+            return size
+    return 0
+
+def clean_boundaries(fetcher, chunks, entries, ends):
+    """Share of chunk ends (except the last) on a sentence end or before a pause"""
+    clean = 0
+    for chunk in chunks[:-1]:
+        i = ends.get(round(chunk['end'], 6))
+        if i is None:
+            continue
+        pause = i + 1 < len(entries) and entries[i + 1]['start'] - chunk['end'] >= fetcher.chunk_pause_gap
+        if pause or fetcher._ends_sentence(entries[i]['text']):
+            clean += 1
+    return clean / max(1, len(chunks) - 1)
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, nargs='+', default=[10000, 20000, 40000, 80000, 160000],
+                        help='Caption entry counts to chunk')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per measurement (best is reported)')
+    parser.add_argument('--snap-slack', type=float, default=None,
+                        help='CHUNK_SNAP_SLACK of the snapped pipeline (default: the env value, or 10s if unset)')
+    args = parser.parse_args()
+
+    fetcher = TranscriptFetcher()
+    fetcher.chunk_snap_slack = 0
+
+    snapping = TranscriptFetcher()
+    if args.snap_slack is not None:
+        snapping.chunk_snap_slack = args.snap_slack
+    elif snapping.chunk_snap_slack <= 0:
+        snapping.chunk_snap_slack = 10
+
+    pipelines = (
+        ('legacy', lambda entries: legacy_chunks(fetcher, entries)),
+        ('exact', fetcher._create_chunks_with_timestamps),
+        ('snapped', snapping._create_chunks_with_timestamps)
+    )
+
+    print(f"CHUNK_DURATION={fetcher.chunk_duration}s CHUNK_OVERLAP={fetcher.chunk_overlap}s "
+          f"snapped CHUNK_SNAP_SLACK={snapping.chunk_snap_slack:g}s")
+    print(f"{'entries':>8}{'pipeline':>10}{'time':>10}{'us/entry':>10}{'chunks':>8}{'overlap':>10}{'clean ends':>12}")
+    for count in args.entries:
+        entries = generate_entries(count)
+        ends = entry_index(entries)
+        for name, chunk in pipelines:
+            chunks, seconds = best_time(lambda: chunk(entries), args.repeat)
+            print(f"{count:>8}{name:>10}{seconds * 1000:>8.1f}ms{seconds / count * 1e6:>10.2f}{len(chunks):>8}"
+                  f"{mean_overlap(chunks, entries, ends):>9.1f}s{clean_boundaries(fetcher, chunks, entries, ends):>11.0%}")
+
+if __name__ == '__main__':
+    main()
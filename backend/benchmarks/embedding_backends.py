@@ -0,0 +1,226 @@
+"""
+Embedding backend benchmark
+
+Compares embedding backends on real transcript chunks: corpus throughput,
+single-query latency and retrieval quality. Quality is measured two ways:
+
+- known-item recall@k: each query is a shuffled, partially dropped word
+  window taken from one chunk and should retrieve that chunk
+- agreement recall@k: how much of the reference backend's (the first one
+  listed) top-k each other backend also returns
+
+    python benchmarks/embedding_backends.py --backends text-embedding-3-small local-hashing
+    python benchmarks/embedding_backends.py --file lecture.txt --queries 500
+
+Remote backends are skipped when OPENAI_API_KEY is not set. With
+--offline-check, the local backends listed instead embed and search a
+synthetic transcript through EmbeddingsManager with all network access
+blocked, the way an offline host would run ingestion:
+
+    python benchmarks/embedding_backends.py --offline-check --backends local-hashing
+"""
+
+import os
+import sys
+import socket
+import time
+import json
+import argparse
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(BACKEND_DIR, 'data', 'videos')
+
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+from utils.embedding_backends import create_embedding_backend, LOCAL_MODELS
+from utils.video_store import VideoStore
+
+def load_store_chunks(directory, limit):
+    """Chunk texts of the videos in a video store"""
+    store = VideoStore(directory)
+    texts = []
+    for video_id in store.video_ids():
+        video = store.get(video_id)
+        if video is not None:
+            texts.extend(chunk['text'] for chunk in video['chunks'])
+        if len(texts) >= limit:
+            break
+    return texts[:limit]
+
+def load_file_chunks(path, chunk_words, limit):
+    """Split a plain-text file into chunks of chunk_words words"""
+    with open(path, 'r', encoding='utf-8') as f:
+        words = f.read().split()
+    texts = [' '.join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)]
+    return texts[:limit]
+
+def make_queries(texts, count, rng, window=12, drop=0.3):
+    """Known-item queries: a shuffled word window of a chunk with some words dropped"""
+    queries = []
+    for target in rng.choice(len(texts), min(count, len(texts)), replace=False):
+        words = texts[target].split()
+        start = int(rng.integers(0, max(1, len(words) - window)))
+        picked = [word for word in words[start:start + window] if rng.random() >= drop] or words[start:start + 1]
+        rng.shuffle(picked)
+        queries.append((' '.join(picked), int(target)))
+    return queries
+
+def embed_all(backend, texts, batch_size):
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        matrix, _ = backend.embed(texts[start:start + batch_size])
+        vectors.append(matrix)
+    matrix = np.vstack(vectors).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def top_k(matrix, queries, k):
+    scores = queries @ matrix.T
+    k = min(k, matrix.shape[0])
+    top = np.argpartition(scores, -k, axis=1)[:, -k:]
+    order = np.argsort(np.take_along_axis(scores, top, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+def benchmark_backend(backend, texts, queries, ks, batch_size, latency_samples):
+    started = time.perf_counter()
+    corpus = embed_all(backend, texts, batch_size)
+    corpus_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query, _ in queries[:latency_samples]:
+        started = time.perf_counter()
+        backend.embed([query])
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    query_matrix = embed_all(backend, [query for query, _ in queries], batch_size)
+    ranked = top_k(corpus, query_matrix, max(ks))
+    targets = np.array([target for _, target in queries])
+
+    return {
+        'backend': backend.name,
+        'dim': int(corpus.shape[1]),
+        'corpus_seconds': round(corpus_seconds, 3),
+        'chunks_per_second': round(len(texts) / corpus_seconds, 1) if corpus_seconds else None,
+        'query_ms_p50': round(float(np.percentile(latencies, 50)), 2),
+        'query_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+        'known_item_recall': {
+            f"@{k}": round(float((ranked[:, :k] == targets[:, None]).any(axis=1).mean()), 3) for k in ks
+        },
+        '_ranked': ranked
+    }
+
+def agreement(ranked, reference, k):
+    """Mean fraction of the reference top-k also present in the top-k"""
+    return float(np.mean([
+        len(set(row[:k]) & set(ref[:k])) / len(ref[:k]) for row, ref in zip(ranked, reference)
+    ]))
+
+def offline_check(models):
+    """Ingest and search a synthetic transcript with each local model while the network is blocked"""
+    def blocked(*args, **kwargs):
+        raise OSError('network access is blocked by --offline-check')
+
+    socket.socket.connect = blocked
+    socket.create_connection = blocked
+    socket.getaddrinfo = blocked
+
+    from utils.embeddings_manager import EmbeddingsManager
+
+    words = "gradient descent moves the weights downhill while the learning rate sets the step size".split()
+    rng = np.random.default_rng(0)
+    chunks = [
+        {'text': ' '.join(rng.choice(words, 40)), 'start': i * 30.0, 'duration': 30.0}
+        for i in range(200)
+    ]
+
+    passed = True
+    for model in models:
+        os.environ['EMBEDDING_MODEL'] = model
+        try:
+            manager = EmbeddingsManager(api_key=None)
+            embedded = manager.create_embeddings({'chunks': chunks})
+            hits = manager.find_relevant_chunks(chunks[7]['text'], embedded['chunks'], embedded['embeddings'], top_k=1)
+            ok = bool(hits) and hits[0]['start'] == chunks[7]['start']
+            print(f"{manager.embedding_model:<28} {'ok' if ok else 'wrong top hit'} "
+                  f"({len(embedded['chunks'])} chunks embedded offline)")
+        except Exception as e:
+            ok = False
+            print(f"{model:<28} failed: {type(e).__name__}: {e}")
+        passed = passed and ok
+    return 0 if passed else 1
+
+def main(argv=None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Benchmark embedding backends on transcript chunks')
+    parser.add_argument('--backends', nargs='+', default=['text-embedding-3-small', 'local-hashing'],
+                        help='EMBEDDING_MODEL values to compare; the first is the agreement reference')
+    parser.add_argument('--store', default=os.getenv('VIDEO_STORE_DIR', DEFAULT_STORE_DIR),
+                        help='video store directory to take chunks from')
+    parser.add_argument('--file', help='plain-text file to chunk instead of the video store')
+    parser.add_argument('--chunk-words', type=int, default=120, help='words per chunk with --file (default: 120)')
+    parser.add_argument('--max-chunks', type=int, default=5000, help='corpus size limit (default: 5000)')
+    parser.add_argument('--queries', type=int, default=200, help='known-item queries (default: 200)')
+    parser.add_argument('--latency-samples', type=int, default=50, help='single-query calls to time (default: 50)')
+    parser.add_argument('--batch-size', type=int, default=256, help='texts per embed call (default: 256)')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10], help='recall cut-offs (default: 1 5 10)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--offline-check', action='store_true',
+                        help='check that the local backends ingest and search with the network blocked')
+    args = parser.parse_args(argv)
+
+    if args.offline_check:
+        models = [model for model in args.backends if model in LOCAL_MODELS]
+        if not models:
+            parser.error('--offline-check needs at least one local backend in --backends')
+        return offline_check(models)
+
+    if args.file:
+        texts = load_file_chunks(args.file, args.chunk_words, args.max_chunks)
+    else:
+        texts = load_store_chunks(args.store, args.max_chunks)
+    if not texts:
+        parser.error('no chunks found; process some videos first or pass --file')
+
+    queries = make_queries(texts, args.queries, np.random.default_rng(args.seed))
+
+    results = []
+    for model in args.backends:
+        if model not in LOCAL_MODELS and not os.getenv('OPENAI_API_KEY'):
+            print(f"Skipping {model}: OPENAI_API_KEY is not set", file=sys.stderr)
+            continue
+        backend = create_embedding_backend(model, os.getenv('OPENAI_API_KEY'))
+        results.append(benchmark_backend(backend, texts, queries, args.k, args.batch_size, args.latency_samples))
+
+    if results:
+        reference = results[0]['_ranked']
+        for result in results[1:]:
+            result[f"agreement_with_{results[0]['backend']}"] = {
+                f"@{k}": round(agreement(result['_ranked'], reference, k), 3) for k in args.k
+            }
+    for result in results:
+        del result['_ranked']
+
+    report = {'chunks': len(texts), 'queries': len(queries), 'results': results}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{len(texts)} chunks, {len(queries)} known-item queries\n")
+    for result in results:
+        recall = '  '.join(f"R{k}={v}" for k, v in result['known_item_recall'].items())
+        print(
+            f"{result['backend']:<28} dim={result['dim']:<5} {result['chunks_per_second']:>9} chunks/s  "
+            f"query p50={result['query_ms_p50']}ms p95={result['query_ms_p95']}ms  {recall}"
+        )
+        for key, value in result.items():
+            if key.startswith('agreement_with_'):
+                print(f"{'':<28} {key.replace('_', ' ')}: " + '  '.join(f"{k}={v}" for k, v in value.items()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
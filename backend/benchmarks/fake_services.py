@@ -0,0 +1,319 @@
+"""
+Local stand-ins for YouTube and the OpenAI API
+
+Serves generated watch pages, json3/XML caption payloads and deterministic
+embedding and chat completion responses, with configurable latency, so the
+backend can be exercised and benchmarked without network access. Point the
+backend at it with:
+
+    YOUTUBE_BASE_URL=http://127.0.0.1:8900
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+
+    python benchmarks/fake_services.py --port 8900 --openai-latency 0.2
+
+Video ids encode the transcript length: the first three characters are
+the length in minutes, e.g. '060min00001' is a one hour video. Any other
+11-character id gets a ten minute transcript.
+"""
+
+import sys
+import json
+import time
+import zlib
+import base64
+import random
+import argparse
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "today we look at how neural networks learn from data the model makes a prediction "
+    "compares it with the answer and nudges every weight a little in the direction that "
+    "reduces the error this is gradient descent and with enough examples it finds patterns "
+    "in images text and sound that nobody programmed by hand we will also cover overfitting "
+    "regularization learning rates batch sizes and why deeper networks need careful initialization"
+).split()
+
+DEFAULT_MINUTES = 10
+
+def video_minutes(video_id):
+    """Transcript length encoded in a benchmark video id"""
+    try:
+        return max(1, int(video_id[:3]))
+    except ValueError:
+        return DEFAULT_MINUTES
+
+def generate_transcript(video_id):
+    """Deterministic caption entries for a video, about 2.5 words per second"""
+    rng = random.Random(zlib.crc32(video_id.encode('utf-8')))
+    entries = []
+    start = 0.0
+    end = video_minutes(video_id) * 60.0
+    while start < end:
+        duration = rng.uniform(1.5, 4.0)
+        words = [rng.choice(WORDS) for _ in range(max(1, int(duration * 2.5)))]
+        entries.append((start, duration, ' '.join(words)))
+        start += duration
+    return entries
+
+def render_json3(entries):
+    events = [
+        {
+            'tStartMs': int(start * 1000),
+            'dDurationMs': int(duration * 1000),
+            'wWinId': 1,
+            'segs': [{'utf8': (' ' if i else '') + word} for i, word in enumerate(text.split())]
+        }
+        for start, duration, text in entries
+    ]
+    return json.dumps({'wireMagic': 'pb3', 'pens': [{}], 'events': events})
+
+def render_xml(entries):
+    parts = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+    for start, duration, text in entries:
+        parts.append(f'<text start="{start:.3f}" dur="{duration:.3f}">{escape(escape(text))}</text>')
+    parts.append('</transcript>')
+    return ''.join(parts)
+
+def fake_embedding(text, dim):
+    """Unit vector seeded by the text, so equal texts embed identically"""
+    rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeServices:
+    """Threaded HTTP server for the fake YouTube and OpenAI endpoints"""
+
+    def __init__(self, host='127.0.0.1', port=0, youtube_latency=0.0, openai_latency=0.0,
+                 token_delay=0.0, caption_format='json3', embedding_dim=1536, answer_words=60):
+        self.youtube_latency = youtube_latency
+        self.openai_latency = openai_latency
+        self.token_delay = token_delay
+        self.caption_format = caption_format
+        self.embedding_dim = embedding_dim
+        self.answer_words = answer_words
+        self.requests = {}
+        self._lock = threading.Lock()
+
+        services = self
+
+        class Handler(FakeServicesHandler):
+            pass
+
+        Handler.services = services
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-services', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    services = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/watch':
+            self._youtube('watch')
+            self._send(200, self._watch_page(params.get('v', '')), 'text/html; charset=utf-8')
+        elif url.path == '/api/timedtext':
+            self._youtube('timedtext')
+            entries = generate_transcript(params.get('v', ''))
+            if params.get('fmt') == 'json3':
+                self._send(200, render_json3(entries), 'application/json; charset=utf-8')
+            else:
+                self._send(200, render_xml(entries), 'text/xml; charset=utf-8')
+        else:
+            self._send(404, json.dumps({'error': 'not found'}), 'application/json')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        if url.path == '/v1/embeddings':
+            self._openai('embeddings')
+            self._send(200, json.dumps(self._embeddings(body)), 'application/json')
+        elif url.path == '/v1/chat/completions':
+            self._openai('chat')
+            if body.get('stream'):
+                self._stream_chat(body)
+            else:
+                self._send(200, json.dumps(self._chat(body)), 'application/json')
+        else:
+            self._send(404, json.dumps({'error': {'message': 'not found'}}), 'application/json')
+
+    def _youtube(self, endpoint):
+        self.services.count(endpoint)
+        if self.services.youtube_latency:
+            time.sleep(self.services.youtube_latency)
+
+    def _openai(self, endpoint):
+        self.services.count(endpoint)
+        if self.services.openai_latency:
+            time.sleep(self.services.openai_latency)
+
+    def _watch_page(self, video_id):
+        services = self.services
+        caption_url = f"{services.url}/api/timedtext?v={video_id}&lang=en"
+        if services.caption_format == 'json3':
+            caption_url += '&fmt=json3'
+
+        player_response = {
+            'playabilityStatus': {'status': 'OK'},
+            'videoDetails': {
+                'videoId': video_id,
+                'title': f'Benchmark video {video_id}',
+                'author': 'Benchmark Channel',
+                'lengthSeconds': str(video_minutes(video_id) * 60)
+            },
+            'captions': {
+                'playerCaptionsTracklistRenderer': {
+                    'captionTracks': [{'baseUrl': caption_url, 'languageCode': 'en', 'kind': 'asr'}]
+                }
+            }
+        }
+        return (
+            '<!DOCTYPE html><html><head><title>Benchmark</title></head><body>'
+            f'<script>var ytInitialPlayerResponse = {json.dumps(player_response)};</script>'
+            '</body></html>'
+        )
+
+    def _embeddings(self, body):
+        inputs = body.get('input', [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = int(body.get('dimensions') or self.services.embedding_dim)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, dim)
+            if body.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(vector.tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+
+        tokens = sum(len(text.split()) for text in inputs)
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        }
+
+    def _answer(self, body):
+        question = body['messages'][-1]['content'] if body.get('messages') else ''
+        rng = random.Random(zlib.crc32(question.encode('utf-8')))
+        words = [rng.choice(WORDS) for _ in range(self.services.answer_words)]
+        prompt_tokens = sum(len(str(message.get('content', '')).split()) for message in body.get('messages', []))
+        return words, {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(words),
+            'total_tokens': prompt_tokens + len(words)
+        }
+
+    def _chat(self, body):
+        words, usage = self._answer(body)
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ' '.join(words)},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage
+        }
+
+    def _stream_chat(self, body):
+        words, usage = self._answer(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(choices, usage=None):
+            data = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model'),
+                'choices': choices
+            }
+            if usage is not None:
+                data['usage'] = usage
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        for i, word in enumerate(words):
+            if self.services.token_delay:
+                time.sleep(self.services.token_delay)
+            chunk([{'index': 0, 'delta': {'content': (' ' if i else '') + word}, 'finish_reason': None}])
+        chunk([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            chunk([], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='Seconds added to each YouTube response')
+    parser.add_argument('--openai-latency', type=float, default=0.2, help='Seconds added to each OpenAI response')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='Seconds between streamed answer tokens')
+    parser.add_argument('--caption-format', choices=('json3', 'xml'), default='json3', help='Format of the caption track')
+    args = parser.parse_args()
+
+    services = FakeServices(
+        args.host, args.port, youtube_latency=args.youtube_latency, openai_latency=args.openai_latency,
+        token_delay=args.token_delay, caption_format=args.caption_format
+    )
+    print(f"Fake YouTube and OpenAI listening on {services.url}", file=sys.stderr)
+    try:
+        services.server.serve_forever()
+    except KeyboardInterrupt:
+        services.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Quantized embedding storage benchmark
+
+Measures what float16 and int8 embedding storage (EMBEDDING_STORAGE) cost
+in retrieval quality: recall@k of the approximate scores and of the
+rescored scores against exact float32 search, plus memory per vector and
+query latency. Queries are stored chunk embeddings with Gaussian noise
+added, so no API calls are made.
+
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --file lecture.txt --k 5 10
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(BACKEND_DIR, 'data', 'videos')
+
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+from utils.quantization import QuantizedEmbeddings, recall_at_k
+from utils.video_store import VideoStore
+
+def load_store_embeddings(directory, limit):
+    """Full-precision embeddings of the videos in a video store"""
+    store = VideoStore(directory)
+    matrices = []
+    rows = 0
+    for video_id in store.video_ids():
+        video = store.get(video_id)
+        if video is not None and len(video['embeddings']):
+            matrices.append(np.asarray(video['embeddings'], dtype=np.float32))
+            rows += len(matrices[-1])
+        if rows >= limit:
+            break
+    if not matrices or len({matrix.shape[1] for matrix in matrices}) != 1:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(matrices)[:limit]
+
+def embed_file(path, chunk_words, limit):
+    """Embed a plain-text file with the local hashing backend"""
+    from utils.embedding_backends import HashingEmbeddingBackend
+
+    with open(path, 'r', encoding='utf-8') as f:
+        words = f.read().split()
+    texts = [' '.join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)][:limit]
+    matrix, _ = HashingEmbeddingBackend().embed(texts)
+    return matrix
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+def benchmark_storage(corpus, queries, storage, ks, rescore_factor):
+    quantized = QuantizedEmbeddings.quantize(corpus, storage, full=corpus)
+    exact = queries @ corpus.T
+
+    started = time.perf_counter()
+    approximate = np.vstack([quantized @ query for query in queries])
+    approximate_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    results = {}
+    for k in ks:
+        started = time.perf_counter()
+        rescored = np.vstack([
+            quantized.rescore(scores, query, k, rescore_factor) for scores, query in zip(approximate, queries)
+        ])
+        rescore_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        results[f"@{k}"] = {
+            'recall': round(recall_at_k(exact, approximate, k), 4),
+            'recall_rescored': round(recall_at_k(exact, rescored, k), 4),
+            'rescore_ms': round(rescore_ms, 3)
+        }
+
+    return {
+        'storage': storage,
+        'bytes_per_vector': round(quantized.nbytes / len(corpus), 1),
+        'compression': round(corpus.nbytes / quantized.nbytes, 2),
+        'query_ms': round(approximate_ms, 3),
+        'recall_at': results
+    }
+
+def main(argv=None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Benchmark quantized embedding storage against float32')
+    parser.add_argument('--store', default=os.getenv('VIDEO_STORE_DIR', DEFAULT_STORE_DIR),
+                        help='video store directory to take embeddings from')
+    parser.add_argument('--file', help='plain-text file to embed locally instead of the video store')
+    parser.add_argument('--chunk-words', type=int, default=120, help='words per chunk with --file (default: 120)')
+    parser.add_argument('--max-chunks', type=int, default=20000, help='corpus size limit (default: 20000)')
+    parser.add_argument('--queries', type=int, default=200, help='queries (default: 200)')
+    parser.add_argument('--noise', type=float, default=0.5, help='query noise relative to a unit vector (default: 0.5)')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10], help='recall cut-offs (default: 1 5 10)')
+    parser.add_argument('--rescore-factor', type=int, default=int(os.getenv('EMBEDDING_RESCORE_FACTOR', 4)),
+                        help='candidates rescored per result (default: EMBEDDING_RESCORE_FACTOR or 4)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.file:
+        corpus = embed_file(args.file, args.chunk_words, args.max_chunks)
+    else:
+        corpus = load_store_embeddings(args.store, args.max_chunks)
+    if len(corpus) == 0:
+        parser.error('no embeddings found; process some videos first or pass --file')
+    corpus = normalize(corpus)
+
+    rng = np.random.default_rng(args.seed)
+    picked = corpus[rng.choice(len(corpus), min(args.queries, len(corpus)), replace=False)]
+    noise = rng.normal(size=picked.shape) * args.noise / np.sqrt(corpus.shape[1])
+    queries = normalize(picked + noise)
+
+    report = {
+        'vectors': len(corpus),
+        'dim': int(corpus.shape[1]),
+        'float32_bytes_per_vector': corpus.shape[1] * 4,
+        'results': [benchmark_storage(corpus, queries, storage, args.k, args.rescore_factor) for storage in ('float16', 'int8')]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"{report['vectors']} vectors x {report['dim']} dims, {len(queries)} queries, "
+          f"float32 = {report['float32_bytes_per_vector']} bytes/vector\n")
+    for result in report['results']:
+        print(f"{result['storage']:<8} {result['bytes_per_vector']:>8} bytes/vector  "
+              f"{result['compression']}x smaller  {result['query_ms']}ms/query")
+        for k, recall in result['recall_at'].items():
+            print(f"{'':<8} recall{k:<4} {recall['recall']:.4f} approximate, "
+                  f"{recall['recall_rescored']:.4f} rescored (+{recall['rescore_ms']}ms)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Offline service benchmark
+
+Starts the fake YouTube/OpenAI server (benchmarks/fake_services.py) and
+the backend app on local ports, then measures throughput and p50/p95/p99
+latency of /api/process-video, /api/chat and /api/search-transcript over
+HTTP for several transcript lengths and concurrency levels. Nothing
+leaves the machine; stored videos and caches go to a temporary directory.
+
+    python benchmarks/service_load.py
+    python benchmarks/service_load.py --minutes 10 60 --concurrency 1 8 32 --requests 64
+    python benchmarks/service_load.py --openai-latency 0.5 --caption-format xml --json
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import threading
+import itertools
+import numpy as np
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_services import FakeServices, WORDS
+
+ENDPOINTS = ('process-video', 'chat', 'search-transcript')
+
+def start_backend(services, data_dir, answer_cache):
+    """Import the app against the fake services and serve it on a free port"""
+    os.environ.update({
+        'YOUTUBE_BASE_URL': services.url,
+        'OPENAI_BASE_URL': f"{services.url}/v1",
+        'OPENAI_API_KEY': 'sk-offline-benchmark',
+        'VIDEO_STORE_DIR': os.path.join(data_dir, 'videos'),
+        'EMBEDDING_CACHE_PATH': os.path.join(data_dir, 'cache.sqlite3'),
+        'ANSWER_CACHE_SIZE': os.environ.get('ANSWER_CACHE_SIZE', '2048') if answer_cache else '0'
+    })
+
+    import logging
+    from werkzeug.serving import make_server
+    import app as backend
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = make_server('127.0.0.1', 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='backend', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def percentile(latencies, q):
+    return float(np.percentile(latencies, q)) * 1000 if latencies else float('nan')
+
+def run_load(client, url, payloads, concurrency):
+    """POST every payload with ``concurrency`` threads; returns stats for the run"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(payload):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            response = client.post(url, json=payload)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, payloads))
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': len(payloads),
+        'errors': errors,
+        'throughput': len(latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99)
+    }
+
+def question(i):
+    """A distinct question per request, so query embedding and answer caches do not hide the work"""
+    words = [WORDS[(i * 7 + j * 13) % len(WORDS)] for j in range(6)]
+    return f"What does the video say about {' '.join(words)}? ({i})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, nargs='+', default=[10, 60], help='Transcript lengths to test')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=32, help='Requests per endpoint and level')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='Seconds added to each YouTube response')
+    parser.add_argument('--openai-latency', type=float, default=0.2, help='Seconds added to each OpenAI response')
+    parser.add_argument('--caption-format', choices=('json3', 'xml'), default='json3')
+    parser.add_argument('--answer-cache', action='store_true', help='Keep the chat answer cache enabled')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    services = FakeServices(
+        youtube_latency=args.youtube_latency,
+        openai_latency=args.openai_latency,
+        caption_format=args.caption_format
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix='service-bench-') as data_dir:
+        server, base_url = start_backend(services, data_dir, args.answer_cache)
+        serials = itertools.count(1)
+        questions = itertools.count()
+        results = []
+        if not args.json:
+            print(f"{'endpoint':<20}{'min':>5}{'conc':>6}{'reqs':>6}{'errors':>7}{'req/s':>9}"
+                  f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        with httpx.Client(base_url=base_url, timeout=600, limits=limits) as client:
+            for minutes in args.minutes:
+                sample_video = None
+                for concurrency in args.concurrency:
+                    video_ids = [f"{minutes:03d}min{next(serials):05d}" for _ in range(args.requests)]
+                    if 'process-video' in args.endpoints or sample_video is None:
+                        payloads = [{'video_url': video_id, 'wait': True} for video_id in video_ids]
+                        stats = run_load(client, '/api/process-video', payloads, concurrency)
+                        sample_video = sample_video or video_ids[0]
+                        if 'process-video' in args.endpoints:
+                            results.append(dict(stats, endpoint='process-video', minutes=minutes, concurrency=concurrency))
+
+                    if 'chat' in args.endpoints:
+                        payloads = [
+                            {'video_id': sample_video, 'message': question(next(questions))}
+                            for _ in range(args.requests)
+                        ]
+                        stats = run_load(client, '/api/chat', payloads, concurrency)
+                        results.append(dict(stats, endpoint='chat', minutes=minutes, concurrency=concurrency))
+
+                    if 'search-transcript' in args.endpoints:
+                        payloads = [
+                            {'video_id': sample_video, 'query': question(next(questions))}
+                            for _ in range(args.requests)
+                        ]
+                        stats = run_load(client, '/api/search-transcript', payloads, concurrency)
+                        results.append(dict(stats, endpoint='search-transcript', minutes=minutes, concurrency=concurrency))
+
+                    if not args.json:
+                        for row in results[-len(args.endpoints):]:
+                            print_row(row)
+
+        server.shutdown()
+    services.stop()
+
+    if args.json:
+        print(json.dumps({'results': results, 'fake_requests': services.requests}, indent=2))
+    else:
+        print(f"\nFake service requests: {services.requests}")
+
+def print_row(row):
+    print(f"{row['endpoint']:<20}{row['minutes']:>5}{row['concurrency']:>6}{row['requests']:>6}{row['errors']:>7}"
+          f"{row['throughput']:>9.1f}{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""Production gunicorn settings: ``gunicorn -c gunicorn.conf.py app:app``.
+
+The app is imported once in the master (``preload_app``) and the vector
+index is built there before forking, so workers share its pages, the
+quantized embeddings and the code copy-on-write. Those objects are moved
+out of the garbage collector's reach with ``gc.freeze()`` so collections
+in the workers do not touch, and thereby copy, the shared pages.
+Stored videos, job status and chat sessions live on disk and are visible
+to every worker; see VideoStore, JobManager and SessionStore.
+"""
+import gc
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+keepalive = 5
+preload_app = True
+accesslog = '-'
+
+
+def when_ready(server):
+    import app
+
+    app.vector_index_thread.join()
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded app; {gc.get_freeze_count()} objects frozen before forking workers")
@@ -0,0 +1,67 @@
+"""
+Batch ingestion CLI
+
+Processes many YouTube videos in one run, e.g. to backfill a course or channel:
+
+    python ingest.py https://youtu.be/VIDEO_ID_1 VIDEO_ID_2 --concurrency 8
+    python ingest.py --file lectures.txt
+"""
+
+import sys
+import json
+import argparse
+
+def read_video_list(path):
+    """Read URLs/IDs from a file, one per line ('#' starts a comment)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process many YouTube videos in one batch')
+    parser.add_argument('videos', nargs='*', help='YouTube URLs or video IDs')
+    parser.add_argument('--file', '-f', help='file with one URL or video ID per line')
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help='transcripts fetched in parallel (default: 4)')
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    args = parser.parse_args(argv)
+
+    videos = list(args.videos)
+    if args.file:
+        videos.extend(read_video_list(args.file))
+
+    if not videos:
+        parser.error('no videos given')
+
+    from app import transcript_fetcher, video_ingestor
+
+    video_ids = []
+    for video in videos:
+        video_id = transcript_fetcher.extract_video_id(video)
+        if video_id:
+            video_ids.append(video_id)
+        else:
+            print(f"Skipping invalid YouTube URL: {video}", file=sys.stderr)
+
+    report = video_ingestor.ingest_many(video_ids, concurrency=args.concurrency)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for result in report['results']:
+            line = f"{result['status']:>18}  {result['video_id']}"
+            if result['status'] == 'processed':
+                line += f"  ({result['chunks_count']} chunks)"
+            elif result['status'] == 'failed':
+                line += f"  {result['error']}"
+            print(line)
+
+        summary = report['summary']
+        print(
+            f"\n{summary['processed']} processed, {summary['already_processed']} already processed, "
+            f"{summary['failed']} failed in {summary['elapsed_seconds']}s "
+            f"({summary['videos_per_second']} videos/s, {summary['chunks_per_second']} chunks/s)"
+        )
+
+    return 1 if report['summary']['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
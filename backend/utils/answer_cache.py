@@ -0,0 +1,129 @@
+import re
+import json
+import hashlib
+import threading
+import logging
+import numpy as np
+from .cache import LRUCache, DiskCache
+
+logger = logging.getLogger(__name__)
+
+class AnswerCache:
+    """Cache of chat answers per video.
+
+    Answers are keyed by (video_id, normalized question, chat model,
+    retrieved chunks), so a hit is always grounded in the same transcript
+    context. When the exact question misses, a near-duplicate is looked up
+    among the video's recent questions by query-embedding cosine similarity
+    (``similarity`` threshold) among those that retrieved the same chunks.
+    The near-duplicate index is per process; exact hits are shared across
+    workers through the optional disk tier.
+    """
+
+    def __init__(self, max_size=2048, ttl=None, similarity=0.95, max_per_video=256, cache_path=None, disk_max_rows=None):
+        self.enabled = max_size > 0
+        self.similarity = similarity
+        self.max_per_video = max_per_video
+
+        disk = None
+        if cache_path and self.enabled:
+            disk = DiskCache(
+                cache_path,
+                'chat_answers',
+                encode=lambda value: json.dumps(value).encode('utf-8'),
+                decode=lambda data: json.loads(data),
+                ttl=ttl,
+                max_rows=disk_max_rows
+            )
+        self.cache = LRUCache(max_size=max_size, ttl=ttl, disk=disk)
+
+        self._questions = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, video_id, question, model, relevant_chunks, query_embedding=None):
+        """Return (answer, match) where match is 'exact', 'semantic' or None"""
+        if not self.enabled:
+            return None, None
+
+        signature = self._chunk_signature(relevant_chunks)
+        answer = self.cache.get(self._key(video_id, self._normalize(question), model, signature))
+        if answer is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return answer, 'exact'
+
+        if query_embedding is not None and self.similarity < 1:
+            key, score = self._nearest(video_id, model, signature, query_embedding)
+            if key is not None:
+                answer = self.cache.get(key)
+                if answer is not None:
+                    logger.info(f"Answer cache near-duplicate hit for video {video_id} (similarity {score:.3f})")
+                    with self._lock:
+                        self.semantic_hits += 1
+                    return answer, 'semantic'
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def set(self, video_id, question, model, relevant_chunks, answer, query_embedding=None):
+        """Cache an answer and remember the question for near-duplicate matching"""
+        if not self.enabled:
+            return
+
+        signature = self._chunk_signature(relevant_chunks)
+        key = self._key(video_id, self._normalize(question), model, signature)
+        self.cache.set(key, answer)
+
+        if query_embedding is None:
+            return
+
+        with self._lock:
+            entries = self._questions.setdefault(video_id, [])
+            entries[:] = [entry for entry in entries if entry[0] != key]
+            entries.append((key, model, signature, np.asarray(query_embedding, dtype=np.float32)))
+            del entries[:-self.max_per_video]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                'size': len(self.cache),
+                'max_size': self.cache.max_size,
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+            }
+
+    def _nearest(self, video_id, model, signature, query_embedding):
+        """Most similar earlier question with the same model and chunks, if above the threshold"""
+        with self._lock:
+            candidates = [
+                entry for entry in self._questions.get(video_id, ())
+                if entry[1] == model and entry[2] == signature
+            ]
+        if not candidates:
+            return None, 0.0
+
+        scores = np.vstack([entry[3] for entry in candidates]) @ np.asarray(query_embedding, dtype=np.float32)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None, 0.0
+        return candidates[best][0], float(scores[best])
+
+    @staticmethod
+    def _normalize(question):
+        return re.sub(r'\s+', ' ', question).strip().rstrip('?!. ').lower()
+
+    @staticmethod
+    def _chunk_signature(relevant_chunks):
+        return ','.join(sorted(f"{chunk['start']:.3f}" for chunk in relevant_chunks))
+
+    @staticmethod
+    def _key(video_id, question, model, signature):
+        return hashlib.sha256(f"{video_id}\0{model}\0{signature}\0{question}".encode('utf-8')).hexdigest()
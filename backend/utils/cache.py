@@ -0,0 +1,288 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class DiskCache:
+    """SQLite-backed key/value tier shared by every process on the host.
+
+    Values are stored as bytes; ``encode``/``decode`` convert them to and from
+    the in-memory representation. Entries older than ``ttl`` seconds are
+    treated as missing. Writes sweep the table at most every
+    ``sweep_interval`` seconds, deleting expired entries and, beyond
+    ``max_rows``, the least recently written ones. Connections are per thread
+    and are not inherited by forked worker processes.
+    """
+
+    def __init__(self, path, table, encode=None, decode=None, ttl=None, max_rows=None, sweep_interval=60):
+        self.path = path
+        self.table = table
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+        self.ttl = ttl or None
+        self.max_rows = max_rows or None
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_connections)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table} (created)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _reset_connections(self):
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+
+    def get(self, key):
+        """Get a value, or None if missing or expired"""
+        try:
+            row = self._connection().execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+        if self.ttl and time.time() - row[1] > self.ttl:
+            return None
+        return self.decode(row[0])
+
+    def set(self, key, value):
+        """Store a value, replacing any previous entry"""
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store several values in a single transaction"""
+        now = time.time()
+        rows = [(key, self.encode(value), now) for key, value in items]
+        if not rows:
+            return
+
+        try:
+            conn = self._connection()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                rows
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+            return
+
+        self._maybe_sweep()
+
+    def add(self, key, value, stale=None):
+        """Store a value unless a live entry exists; returns the value now stored.
+
+        The check and the write run in one transaction, so when several
+        processes add the same key exactly one of them wins and the others get
+        its value back. ``stale(existing)`` returning True lets the new value
+        replace a live entry.
+        """
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not (self.ttl and time.time() - row[1] > self.ttl):
+                    existing = self.decode(row[0])
+                    if stale is None or not stale(existing):
+                        conn.rollback()
+                        return existing
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                    (key, self.encode(value), time.time())
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+            return value
+
+        self._maybe_sweep()
+        return value
+
+    def delete(self, key, value=None):
+        """Delete an entry, only while it still holds ``value`` if given; returns whether one was removed"""
+        try:
+            conn = self._connection()
+            if value is None:
+                cursor = conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            else:
+                cursor = conn.execute(
+                    f"DELETE FROM {self.table} WHERE key = ? AND value = ?", (key, self.encode(value))
+                )
+            conn.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache delete failed: {str(e)}")
+            return False
+
+    def sweep(self):
+        """Delete expired entries and the oldest ones beyond ``max_rows``; returns how many were removed"""
+        removed = 0
+        try:
+            conn = self._connection()
+            if self.ttl:
+                removed += conn.execute(
+                    f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if self.max_rows:
+                removed += conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,)
+                ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache sweep failed: {str(e)}")
+
+        if removed:
+            logger.info(f"Swept {removed} entries from disk cache {self.table}")
+        return removed
+
+    def _maybe_sweep(self):
+        if self.ttl is None and self.max_rows is None:
+            return
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def delete_prefix(self, prefix):
+        """Delete every entry whose key starts with ``prefix``; returns how many were removed"""
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                f"DELETE FROM {self.table} WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache delete failed: {str(e)}")
+            return 0
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with optional TTL and disk tier.
+
+    On a memory miss the optional ``disk`` tier (a ``DiskCache``) is consulted
+    and hits are promoted into memory; writes go to both tiers.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, disk=None):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Get a cached value and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        """Cache a value in memory and, if configured, on disk"""
+        self._store(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def set_many(self, items):
+        """Cache several values, writing the disk tier in one transaction"""
+        items = list(items)
+        for key, value in items:
+            self._store(key, value)
+        if self.disk is not None:
+            self.disk.set_many(items)
+
+    def _store(self, key, value):
+        if self.max_size <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,170 @@
+import re
+import json
+import html
+import codecs
+import logging
+import itertools
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+EVENTS_PATTERN = re.compile(r'"events"\s*:\s*\[')
+
+def iter_caption_entries(data):
+    """Yield caption entries ({'text', 'start', 'duration'}) from a json3 or XML payload.
+
+    ``data`` is a str, bytes or an iterable of bytes chunks (such as
+    ``response.iter_bytes()``). The format is detected from the first
+    character; both parsers work incrementally, so memory stays bounded by
+    the read size instead of growing with the caption file. A malformed
+    payload raises its parse error, possibly after some entries were already
+    yielded, so callers never mistake a truncated transcript for a whole one.
+    """
+    chunks = _iter_chunks(data)
+    for first in chunks:
+        head = first.lstrip()
+        if head:
+            break
+    else:
+        return
+
+    chunks = itertools.chain([first], chunks)
+    if head[:1] in ('{', b'{'):
+        yield from iter_json3_entries(chunks)
+    elif head[:1] in ('<', b'<'):
+        yield from iter_xml_entries(chunks)
+    else:
+        logger.error("Caption data is neither json3 nor XML")
+
+def iter_json3_entries(chunks):
+    """Yield entries from a json3 payload, decoding its 'events' array one event at a time"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    position = 0
+    in_events = False
+
+    try:
+        for chunk in itertools.chain(chunks, [None]):
+            final = chunk is None
+            if final:
+                buffer += text_decoder.decode(b'', final=True)
+            else:
+                buffer += chunk if isinstance(chunk, str) else text_decoder.decode(chunk)
+
+            if not in_events:
+                match = EVENTS_PATTERN.search(buffer)
+                if match is None:
+                    buffer = buffer[-32:]
+                    continue
+                in_events = True
+                position = match.end()
+
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if buffer[position] == ']':
+                    return
+                try:
+                    event, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+
+                entry = _json3_entry(event)
+                if entry is not None:
+                    yield entry
+
+            buffer = buffer[position:]
+            position = 0
+
+        if in_events:
+            # The input ran out after a complete event but before the closing ']'
+            raise json.JSONDecodeError("Unterminated events array", buffer, position)
+
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON3 parse error: {str(e)}")
+        raise
+
+def iter_xml_entries(chunks):
+    """Yield entries from timedtext XML, dropping each element once it is parsed.
+
+    Handles the classic format (``<text start dur>`` in seconds) and format 3
+    (``<p t d>`` in milliseconds, words in ``<s>`` children).
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    open_elements = []
+
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    open_elements.append(elem)
+                    continue
+
+                open_elements.pop()
+                if elem.tag not in ('text', 'p'):
+                    continue
+
+                entry = _xml_entry(elem)
+                if open_elements:
+                    open_elements[-1].remove(elem)
+                if entry is not None:
+                    yield entry
+        parser.close()
+
+    except ET.ParseError as e:
+        logger.error(f"XML parse error: {str(e)}")
+        raise
+
+def clean_caption_text(text):
+    """Unescape HTML entities and strip inline markup such as <font> tags"""
+    text = html.unescape(text)
+    if '<' in text:
+        text = TAG_PATTERN.sub('', text)
+    return text.strip()
+
+def _json3_entry(event):
+    segs = event.get('segs')
+    if not segs:
+        return None
+
+    text = ''.join([seg.get('utf8', '') for seg in segs]).strip()
+    if not text:
+        return None
+
+    return {
+        'text': text,
+        'start': event.get('tStartMs', 0) / 1000.0,
+        'duration': event.get('dDurationMs', 0) / 1000.0
+    }
+
+def _xml_entry(elem):
+    text = clean_caption_text(''.join(elem.itertext()))
+    if not text:
+        return None
+
+    if elem.tag == 'p':
+        start = float(elem.get('t', 0)) / 1000.0
+        duration = float(elem.get('d', 0)) / 1000.0
+    else:
+        start = float(elem.get('start', 0))
+        duration = float(elem.get('dur', 0))
+
+    return {'text': text, 'start': start, 'duration': duration}
+
+def _iter_chunks(data, size=READ_SIZE):
+    if isinstance(data, (str, bytes, bytearray)):
+        for offset in range(0, len(data), size):
+            yield data[offset:offset + size]
+    else:
+        for chunk in data:
+            if chunk:
+                yield chunk
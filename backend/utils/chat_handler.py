@@ -1,28 +1,206 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 import os
+import httpx
 import logging
+from .tokenizer import count_tokens, truncate_tokens
+from .metrics import span, record_openai_usage
 
 logger = logging.getLogger(__name__)
 
 class ChatHandler:
     def __init__(self, api_key):
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
+        self._async_client = None
+        self.async_pool_size = int(os.getenv('CHAT_HTTP_POOL_SIZE', 200))
         self.chat_model = os.getenv('CHAT_MODEL', 'gpt-4-turbo-preview')
+        self.summary_model = os.getenv('CHAT_SUMMARY_MODEL', self.chat_model)
+        self.summary_max_tokens = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', 300))
+        self.context_tokens = int(os.getenv('CHAT_CONTEXT_TOKENS', 3000))
+        self.merge_gap = float(os.getenv('CHAT_CONTEXT_MERGE_GAP', 1.0))
     
-    def generate_response(self, query, relevant_chunks, video_info):
+    def generate_response(self, query, relevant_chunks, video_info, history=None):
         """Generate a response using GPT with relevant context"""
         try:
-            context = self._build_context(relevant_chunks, video_info)
+            messages, context_stats = self._build_messages(query, relevant_chunks, video_info, history)
+
+            with span('chat.completion'):
+                response = self._counted(lambda: self.client.chat.completions.create(**self._completion_args(messages)))
+            
+            logger.info(f"Generated response for query: {query}")
+            
+            return self._response(response, relevant_chunks, context_stats)
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            raise
+    
+    async def agenerate_response(self, query, relevant_chunks, video_info, history=None):
+        """Async generate_response on the pooled AsyncOpenAI client"""
+        try:
+            messages, context_stats = self._build_messages(query, relevant_chunks, video_info, history)
+            
+            with span('chat.completion'):
+                try:
+                    response = await self.async_client.chat.completions.create(**self._completion_args(messages))
+                except Exception:
+                    record_openai_usage('chat', None, outcome='error')
+                    raise
+                record_openai_usage('chat', getattr(response, 'usage', None))
+            
+            logger.info(f"Generated response for query: {query}")
+            
+            return self._response(response, relevant_chunks, context_stats)
             
-            system_message = """You are an AI assistant that helps users understand YouTube video content. 
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            raise
+    
+    def stream_response(self, query, relevant_chunks, video_info, history=None):
+        """Stream a response as events: sources first, then answer deltas, then done with token usage"""
+        yield {'type': 'sources', 'sources': self._extract_sources(relevant_chunks)}
+        
+        try:
+            messages, context_stats = self._build_messages(query, relevant_chunks, video_info, history)
+            usage = None
+            with span('chat.completion'):
+                try:
+                    stream = self.client.chat.completions.create(**self._completion_args(messages, stream=True))
+                    for event in stream:
+                        usage = getattr(event, 'usage', None) or usage
+                        if not event.choices:
+                            continue
+                        content = event.choices[0].delta.content
+                        if content:
+                            yield {'type': 'delta', 'content': content}
+                except Exception:
+                    record_openai_usage('chat', usage, outcome='error')
+                    raise
+            record_openai_usage('chat', usage)
+            
+            logger.info(f"Streamed response for query: {query}")
+            yield {'type': 'done', 'usage': self._usage(context_stats, usage)}
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+    
+    async def astream_response(self, query, relevant_chunks, video_info, history=None):
+        """Async stream_response on the pooled AsyncOpenAI client"""
+        yield {'type': 'sources', 'sources': self._extract_sources(relevant_chunks)}
+        
+        try:
+            messages, context_stats = self._build_messages(query, relevant_chunks, video_info, history)
+            usage = None
+            with span('chat.completion'):
+                try:
+                    stream = await self.async_client.chat.completions.create(**self._completion_args(messages, stream=True))
+                    async for event in stream:
+                        usage = getattr(event, 'usage', None) or usage
+                        if not event.choices:
+                            continue
+                        content = event.choices[0].delta.content
+                        if content:
+                            yield {'type': 'delta', 'content': content}
+                except Exception:
+                    record_openai_usage('chat', usage, outcome='error')
+                    raise
+            record_openai_usage('chat', usage)
+            
+            logger.info(f"Streamed response for query: {query}")
+            yield {'type': 'done', 'usage': self._usage(context_stats, usage)}
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+    
+    @property
+    def async_client(self):
+        """AsyncOpenAI client sharing one connection pool, created on first use"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=self.async_pool_size,
+                        max_keepalive_connections=self.async_pool_size
+                    )
+                )
+            )
+        return self._async_client
+    
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+    
+    @staticmethod
+    def _counted(create, endpoint='chat'):
+        """Run a non-streaming completion call, counting it and its tokens"""
+        try:
+            response = create()
+        except Exception:
+            record_openai_usage(endpoint, None, outcome='error')
+            raise
+        record_openai_usage(endpoint, getattr(response, 'usage', None))
+        return response
+    
+    def _completion_args(self, messages, stream=False):
+        args = {
+            'model': self.chat_model,
+            'messages': messages,
+            'temperature': 0.7,
+            'max_tokens': 1000
+        }
+        if stream:
+            args.update(stream=True, stream_options={'include_usage': True})
+        return args
+    
+    def _response(self, response, relevant_chunks, context_stats):
+        return {
+            'answer': response.choices[0].message.content,
+            'sources': self._extract_sources(relevant_chunks),
+            'usage': self._usage(context_stats, getattr(response, 'usage', None))
+        }
+    
+    def summarize_history(self, summary, turns):
+        """Fold conversation turns into a running summary of the conversation"""
+        transcript = "\n\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+        
+        messages = [
+            {"role": "system", "content": "You maintain a running summary of a conversation about a YouTube video. "
+                                          "Keep the facts, timestamps and open questions a follow-up might refer to. "
+                                          "Be concise."},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\n"
+                                        f"New turns:\n{transcript}\n\nReturn the updated summary."}
+        ]
+        
+        with span('chat.summary'):
+            response = self._counted(lambda: self.client.chat.completions.create(
+                model=self.summary_model,
+                messages=messages,
+                temperature=0,
+                max_tokens=self.summary_max_tokens
+            ), endpoint='chat_summary')
+        
+        return response.choices[0].message.content.strip()
+    
+    def _build_messages(self, query, relevant_chunks, video_info, history=None):
+        """Build the chat messages for a query, its retrieved chunks and earlier turns.
+
+        Returns the messages and the context statistics from _build_context.
+        """
+        context, context_stats = self._build_context(relevant_chunks, video_info)
+        
+        system_message = """You are an AI assistant that helps users understand YouTube video content. 
 You have access to the video transcript with timestamps. When answering questions:
 1. Provide accurate information based on the transcript
 2. Reference specific timestamps when relevant
 3. Be conversational and helpful
 4. If information isn't in the transcript, say so
 5. Format timestamps as clickable references [MM:SS]"""
-            
-            user_message = f"""Based on the following video transcript excerpts, please answer the question.
+        
+        user_message = f"""Based on the following video transcript excerpts, please answer the question.
 
 Video: {video_info['video_url']}
 
@@ -33,45 +211,111 @@ Question: {query}
 
 Please provide a detailed answer with timestamp references where appropriate."""
 
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            answer = response.choices[0].message.content
-            
-            sources = self._extract_sources(relevant_chunks)
-            
-            logger.info(f"Generated response for query: {query}")
-            
-            return {
-                'answer': answer,
-                'sources': sources
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            raise
+        messages = [{"role": "system", "content": system_message}]
+        
+        if history:
+            if history.get('summary'):
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{history['summary']}"
+                })
+            for question, answer in history.get('turns', []):
+                messages.append({"role": "user", "content": question})
+                messages.append({"role": "assistant", "content": answer})
+        
+        messages.append({"role": "user", "content": user_message})
+        return messages, context_stats
     
     def _build_context(self, relevant_chunks, video_info):
-        """Build context string from relevant chunks"""
+        """Build the context string from relevant chunks within the context token budget.
+
+        Chunks are taken in relevance order while the rendered context fits
+        CHAT_CONTEXT_TOKENS. The selected chunks are then merged into
+        contiguous time ranges: chunks that overlap or are at most
+        CHAT_CONTEXT_MERGE_GAP seconds apart are joined, and the text they
+        share from chunk overlap is included once. Returns the context and
+        its token statistics.
+        """
+        selected = []
+        context = ''
+        for chunk in sorted(relevant_chunks, key=lambda chunk: chunk.get('similarity', 0), reverse=True):
+            candidate = self._render_context(self._merge_chunks(selected + [chunk]))
+            if count_tokens(candidate, self.chat_model) <= self.context_tokens:
+                selected.append(chunk)
+                context = candidate
+            elif not selected:
+                header = self._render_context(self._merge_chunks([dict(chunk, text='')]))
+                budget = max(1, self.context_tokens - count_tokens(header, self.chat_model))
+                selected.append(dict(chunk, text=truncate_tokens(chunk['text'], budget, self.chat_model)))
+                context = self._render_context(self._merge_chunks(selected))
+        
+        ranges = self._merge_chunks(selected)
+        chunk_tokens = sum(count_tokens(chunk['text'], self.chat_model) for chunk in selected)
+        range_tokens = sum(count_tokens(text_range['text'], self.chat_model) for text_range in ranges)
+        
+        return context, {
+            'context_tokens': count_tokens(context, self.chat_model),
+            'context_budget': self.context_tokens,
+            'chunks_used': len(selected),
+            'chunks_dropped': len(relevant_chunks) - len(selected),
+            'ranges': len(ranges),
+            'overlap_tokens_removed': max(0, chunk_tokens - range_tokens)
+        }
+    
+    def _merge_chunks(self, chunks):
+        """Merge overlapping or adjacent chunks into time ranges, deduplicating overlap text"""
+        ranges = []
+        for chunk in sorted(chunks, key=lambda chunk: chunk['start']):
+            end = chunk.get('end', chunk['start'] + chunk.get('duration', 0))
+            if ranges and chunk['start'] <= ranges[-1]['end'] + self.merge_gap:
+                current = ranges[-1]
+                current['text'] = self._join_overlapping(current['text'], chunk['text'])
+                current['end'] = max(current['end'], end)
+                current['similarity'] = max(current['similarity'], chunk.get('similarity', 0))
+            else:
+                ranges.append({
+                    'start': chunk['start'],
+                    'end': end,
+                    'text': chunk['text'],
+                    'similarity': chunk.get('similarity', 0)
+                })
+        return ranges
+    
+    @staticmethod
+    def _join_overlapping(text, following, max_overlap_words=200):
+        """Append ``following`` to ``text``, dropping its leading words that repeat the end of ``text``"""
+        words = text.split()
+        next_words = following.split()
+        
+        for size in range(min(len(words), len(next_words), max_overlap_words), 0, -1):
+            if words[-size:] == next_words[:size]:
+                return ' '.join(words + next_words[size:])
+        
+        if ' '.join(next_words) in ' '.join(words):
+            return text
+        return f"{text} {following}"
+    
+    def _render_context(self, ranges):
         context_parts = []
         
-        for i, chunk in enumerate(relevant_chunks, 1):
-            timestamp = self._format_timestamp(chunk['start'])
-            similarity = chunk.get('similarity', 0)
+        for text_range in ranges:
+            start = self._format_timestamp(text_range['start'])
+            end = self._format_timestamp(text_range['end'])
             
             context_parts.append(
-                f"[{timestamp}] (Relevance: {similarity:.2f})\n{chunk['text']}\n"
+                f"[{start} - {end}] (Relevance: {text_range['similarity']:.2f})\n{text_range['text']}\n"
             )
         
         return "\n---\n".join(context_parts)
     
+    def _usage(self, context_stats, usage=None):
+        """Context statistics plus the token usage reported by the API"""
+        return dict(
+            context_stats,
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None)
+        )
+    
     def _extract_sources(self, relevant_chunks):
         """Extract source information with timestamps"""
         sources = []
@@ -0,0 +1,249 @@
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+class ChatSession:
+    """Conversation state for one (session, video) pair.
+
+    Recent turns are kept verbatim; older turns are folded into ``summary``
+    by ``SessionStore.compact`` so the history stays within its token budget.
+    ``listener`` is called with the session, under its lock, after every
+    change; ``revision`` counts those changes.
+    """
+
+    def __init__(self, session_id, video_id, listener=None):
+        self.id = session_id
+        self.video_id = video_id
+        self.summary = ''
+        self.turns = []
+        self.revision = 0
+        self.last_used = time.monotonic()
+        self.compacting = False
+        self.listener = listener
+        self.lock = threading.RLock()
+
+    def history(self):
+        """Summary plus recent (question, answer) turns, for prompt building"""
+        with self.lock:
+            return {
+                'summary': self.summary,
+                'turns': [(turn['question'], turn['answer']) for turn in self.turns]
+            }
+
+    def previous_chunks(self):
+        """Chunks retrieved for the most recent turn"""
+        with self.lock:
+            return list(self.turns[-1]['chunks']) if self.turns else []
+
+    def add_turn(self, question, answer, chunks):
+        with self.lock:
+            self.turns.append({'question': question, 'answer': answer, 'chunks': chunks})
+            self.changed()
+
+    def changed(self):
+        """Record a change to the session (call with the lock held)"""
+        self.revision += 1
+        if self.listener is not None:
+            self.listener(self)
+
+    def state(self):
+        """Serializable snapshot of the summary and turns"""
+        with self.lock:
+            return {'summary': self.summary, 'turns': list(self.turns), 'revision': self.revision}
+
+    def load_state(self, state):
+        """Replace the summary and turns with a snapshot written by another process"""
+        with self.lock:
+            self.summary = state['summary']
+            self.turns = list(state['turns'])
+            self.revision = state['revision']
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'session_id': self.id,
+                'video_id': self.video_id,
+                'summary': self.summary,
+                'turns': [{'question': turn['question'], 'answer': turn['answer']} for turn in self.turns]
+            }
+
+
+class SessionStore:
+    """Bounded store of chat sessions with idle expiry.
+
+    Sessions are evicted least-recently-used beyond ``max_sessions`` and
+    dropped after ``ttl`` idle seconds. Once a session's history exceeds
+    ``history_tokens``, its oldest turns are summarized on a background
+    thread, so prompt size stays roughly constant however long the
+    conversation gets.
+
+    With a ``shared`` DiskCache every change is also written there, and a
+    session is refreshed from it whenever another process has a newer
+    revision, so a conversation can continue on any worker process.
+    Concurrent turns of one session on two workers are last-writer-wins.
+    """
+
+    def __init__(self, max_sessions=1000, ttl=3600, history_tokens=2000, model=None, shared=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.history_tokens = history_tokens
+        self.model = model
+        self.shared = shared
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+
+    def get_or_create(self, session_id, video_id):
+        """Return (session, created); unknown or expired ids start a new session"""
+        session = self.get(session_id, video_id) if session_id else None
+        if session is not None:
+            return session, False
+
+        session = ChatSession(session_id or uuid.uuid4().hex, video_id, listener=self._publish)
+        with self._lock:
+            self._remember(session)
+        with session.lock:
+            session.changed()
+        return session, True
+
+    def get(self, session_id, video_id):
+        """Get a live session, refreshed with changes made by other processes"""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            session = self._sessions.get((session_id, video_id))
+
+        if self.shared is not None:
+            state = self.shared.get(self._shared_key(session_id, video_id))
+            if state is None:
+                # Expired or deleted by another process
+                with self._lock:
+                    self._sessions.pop((session_id, video_id), None)
+                return None
+            if session is None:
+                session = ChatSession(session_id, video_id, listener=self._publish)
+            if state['revision'] != session.revision:
+                session.load_state(state)
+
+        if session is None:
+            return None
+
+        with self._lock:
+            self._remember(session)
+        session.last_used = now
+        return session
+
+    def delete(self, session_id):
+        """Forget a session for every video; returns whether one existed"""
+        with self._lock:
+            keys = [key for key in self._sessions if key[0] == session_id]
+            for key in keys:
+                del self._sessions[key]
+
+        deleted = bool(keys)
+        if self.shared is not None:
+            deleted = self.shared.delete_prefix(f"{session_id}/") > 0 or deleted
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'max_sessions': self.max_sessions}
+
+    def maybe_compact(self, session, summarize):
+        """Schedule summarization of the oldest turns if the history is over budget"""
+        if self._history_tokens(session) > self.history_tokens:
+            self.executor.submit(self.compact, session, summarize)
+
+    def compact(self, session, summarize):
+        """Fold the oldest turns into the summary until the history fits the budget.
+
+        ``summarize(summary, turns)`` returns the new summary. The most recent
+        turn is always kept verbatim; if summarization fails the oldest turns
+        are dropped instead so the budget still holds. The session lock is
+        only held to pick the turns and to apply the result, never during
+        the summarize call, so new turns are not held up by it.
+        """
+        with session.lock:
+            if session.compacting:
+                return
+            keep = len(session.turns)
+            tokens = self._tokens(session.summary) + sum(self._turn_tokens(turn) for turn in session.turns)
+            while keep > 1 and tokens > self.history_tokens:
+                tokens -= self._turn_tokens(session.turns[len(session.turns) - keep])
+                keep -= 1
+
+            folded = session.turns[:len(session.turns) - keep]
+            if not folded:
+                return
+            summary = session.summary
+            session.compacting = True
+
+        try:
+            summary = summarize(summary, [(turn['question'], turn['answer']) for turn in folded])
+        except Exception as e:
+            logger.warning(f"Could not summarize chat session {session.id}, dropping old turns: {str(e)}")
+
+        with session.lock:
+            session.compacting = False
+            if not self._refresh(session):
+                return
+            # Turns are only appended, so unless another process compacted
+            # the session meanwhile, the folded ones are still at the front
+            pairs = [(turn['question'], turn['answer']) for turn in folded]
+            if [(turn['question'], turn['answer']) for turn in session.turns[:len(folded)]] != pairs:
+                return
+            session.summary = summary
+            del session.turns[:len(folded)]
+            session.changed()
+        logger.info(f"Compacted chat session {session.id}: {len(folded)} turns summarized, {keep} kept")
+
+    def _refresh(self, session):
+        """Load a newer revision written by another process; False if the session is gone"""
+        if self.shared is None:
+            return True
+        state = self.shared.get(self._shared_key(session.id, session.video_id))
+        if state is None:
+            return False
+        if state['revision'] != session.revision:
+            session.load_state(state)
+        return True
+
+    def _publish(self, session):
+        if self.shared is not None:
+            self.shared.set(self._shared_key(session.id, session.video_id), session.state())
+
+    def _remember(self, session):
+        key = (session.id, session.video_id)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    @staticmethod
+    def _shared_key(session_id, video_id):
+        return f"{session_id}/{video_id}"
+
+    def _history_tokens(self, session):
+        with session.lock:
+            return self._tokens(session.summary) + sum(self._turn_tokens(turn) for turn in session.turns)
+
+    def _turn_tokens(self, turn):
+        return self._tokens(turn['question']) + self._tokens(turn['answer'])
+
+    def _tokens(self, text):
+        return count_tokens(text, self.model)
+
+    def _prune(self, now):
+        if not self.ttl:
+            return
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl:
+                break
+            del self._sessions[key]
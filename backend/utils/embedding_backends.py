@@ -0,0 +1,199 @@
+import os
+import re
+import zlib
+import logging
+import numpy as np
+from openai import OpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+LOCAL_MODELS = ('local', 'local-hashing', 'local-onnx')
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does
+don't for from had has have he her here him his how i i'm if in into is it it's its just know
+like me more my no not now of oh okay on one or our out really right so some than that that's
+the their them then there these they thing think this to um uh up us very was we we're well were
+what when where which who will with would yeah you you're your
+""".split())
+
+def create_embedding_backend(model, api_key=None):
+    """Build the embedding backend selected by an EMBEDDING_MODEL value.
+
+    ``local`` uses the ONNX model in EMBEDDING_LOCAL_MODEL_DIR when it exists
+    and onnxruntime/tokenizers are installed, otherwise hashed n-grams;
+    ``local-hashing`` and ``local-onnx`` force one of them. Any other value
+    is an OpenAI embedding model name.
+    """
+    if model not in LOCAL_MODELS:
+        return OpenAIEmbeddingBackend(model, api_key)
+
+    model_dir = os.getenv('EMBEDDING_LOCAL_MODEL_DIR', '')
+    if model == 'local-onnx' or (model == 'local' and OnnxEmbeddingBackend.available(model_dir)):
+        return OnnxEmbeddingBackend(model_dir)
+
+    return HashingEmbeddingBackend(dim=int(os.getenv('EMBEDDING_LOCAL_DIM', 512)))
+
+
+class OpenAIEmbeddingBackend:
+    """Remote embeddings from the OpenAI API (one request per call, no client retries)"""
+
+    remote = True
+
+    def __init__(self, model, api_key):
+        self.name = model
+        self.client = OpenAI(api_key=api_key).with_options(max_retries=0)
+
+    def embed(self, texts):
+        """Return (matrix with one row per text, tokens used)"""
+        response = self.client.embeddings.create(input=texts, model=self.name)
+        matrix = np.array([item.embedding for item in response.data], dtype=np.float32)
+        usage = getattr(response, 'usage', None)
+        return matrix, getattr(usage, 'total_tokens', 0) or 0
+
+
+class HashingEmbeddingBackend:
+    """Local CPU embeddings from signed feature hashing.
+
+    Word unigrams (minus stopwords), word bigrams and character trigrams of
+    longer words are hashed with CRC32 into ``dim`` buckets with a +/-1 sign,
+    which is a sparse random projection of the n-gram TF vector. Counts are
+    damped with 1 + log(tf) and the whole batch is accumulated with a single
+    bincount. Needs no model files and gives identical vectors in every
+    process, so its vectors can share the on-disk embedding cache.
+    """
+
+    remote = False
+
+    FEATURE_KINDS = {'w': 0, 'b': 1, 'c': 2}
+    FEATURE_WEIGHTS = (1.0, 0.7, 0.5)
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"local-hashing-{dim}"
+        self._words = {}
+        self._features = {}
+        self._kind_weights = np.array(self.FEATURE_WEIGHTS, dtype=np.float64)
+
+    def embed(self, texts):
+        """Return (matrix with one row per text, tokens used)"""
+        rows = []
+        features = []
+        for row, text in enumerate(texts):
+            count = len(features)
+            words = WORD_PATTERN.findall(text.lower())
+            for i, word in enumerate(words):
+                features.extend(self._word_features(word))
+                if i and not (word in STOPWORDS and words[i - 1] in STOPWORDS):
+                    features.append(self._feature(f"b:{words[i - 1]} {word}"))
+            rows.append(np.full(len(features) - count, row, dtype=np.uint64))
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not features:
+            return matrix, 0
+
+        keys = (np.concatenate(rows) << np.uint64(34)) | np.array(features, dtype=np.uint64)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+
+        feature_hashes = unique_keys & np.uint64(0xFFFFFFFF)
+        kinds = (unique_keys >> np.uint64(32)) & np.uint64(3)
+        signs = np.where(feature_hashes & np.uint64(1 << 31), -1.0, 1.0)
+        values = signs * self._kind_weights[kinds.astype(np.intp)] * (1.0 + np.log(counts))
+        flat = (unique_keys >> np.uint64(34)) * np.uint64(self.dim) + feature_hashes % np.uint64(self.dim)
+
+        matrix += np.bincount(
+            flat.astype(np.int64), weights=values, minlength=len(texts) * self.dim
+        ).reshape(len(texts), self.dim).astype(np.float32)
+        return matrix, 0
+
+    def _word_features(self, word):
+        """Feature codes of a word's unigram and character trigram features, memoized"""
+        features = self._words.get(word)
+        if features is None:
+            features = []
+            if word not in STOPWORDS:
+                features.append(self._feature(f"w:{word}"))
+                if len(word) > 4:
+                    padded = f"<{word}>"
+                    features.extend(self._feature(f"c:{padded[j:j + 3]}") for j in range(len(padded) - 2))
+            if len(self._words) > 200000:
+                self._words.clear()
+            self._words[word] = features
+        return features
+
+    def _feature(self, feature):
+        """Feature code: the kind in bits 32-33 above the CRC32 of the feature"""
+        value = self._features.get(feature)
+        if value is None:
+            if len(self._features) > 500000:
+                self._features.clear()
+            value = self._features[feature] = (
+                self.FEATURE_KINDS[feature[0]] << 32 | zlib.crc32(feature.encode('utf-8'))
+            )
+        return value
+
+
+class OnnxEmbeddingBackend:
+    """Local CPU embeddings from a sentence-transformer exported to ONNX.
+
+    ``model_dir`` holds ``model.onnx`` and its ``tokenizer.json``; token
+    states are mean-pooled over the attention mask. Requires the optional
+    onnxruntime and tokenizers packages.
+    """
+
+    remote = False
+
+    def __init__(self, model_dir, max_length=256):
+        if not self.available(model_dir):
+            raise RuntimeError(
+                f"Local ONNX embeddings need onnxruntime, tokenizers and {os.path.join(model_dir or '.', 'model.onnx')}"
+            )
+
+        self.name = f"local-onnx-{os.path.basename(os.path.normpath(model_dir))}"
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, 'model.onnx'),
+            providers=['CPUExecutionProvider']
+        )
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        logger.info(f"Loaded local ONNX embedding model from {model_dir}")
+
+    @staticmethod
+    def available(model_dir):
+        return (
+            onnxruntime is not None and Tokenizer is not None and bool(model_dir)
+            and os.path.exists(os.path.join(model_dir, 'model.onnx'))
+            and os.path.exists(os.path.join(model_dir, 'tokenizer.json'))
+        )
+
+    def embed(self, texts):
+        """Return (matrix with one row per text, tokens used)"""
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
+        return pooled.astype(np.float32), 0
@@ -1,73 +1,418 @@
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import os
+import re
+import time
+import random
+import hashlib
 import logging
+from .cache import LRUCache, DiskCache
+from .tokenizer import count_tokens, truncate_tokens, estimate_tokens
+from .lexical_index import reciprocal_rank_fusion
+from .embedding_backends import create_embedding_backend, RETRYABLE_ERRORS
+from .quantization import QuantizedEmbeddings
+from .metrics import span, OPENAI_REQUESTS, OPENAI_TOKENS
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingsManager:
-    def __init__(self, api_key):
-        self.client = OpenAI(api_key=api_key)
-        self.embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
-        self.embeddings_cache = {}
+    def __init__(self, api_key, cache_path=None):
+        self.backend = create_embedding_backend(os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small'), api_key)
+        self.embedding_model = self.backend.name
+        
+        self.batch_tokens = int(os.getenv('EMBEDDING_BATCH_TOKENS', 100000))
+        self.batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', 512))
+        self.max_input_tokens = int(os.getenv('EMBEDDING_MAX_INPUT_TOKENS', 8191))
+        self.max_retries = int(os.getenv('EMBEDDING_MAX_RETRIES', 6))
+        self.rescore_factor = int(os.getenv('EMBEDDING_RESCORE_FACTOR', 4))
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('EMBEDDING_WORKERS', 4)),
+            thread_name_prefix='embeddings'
+        )
+        
+        query_cache_ttl = float(os.getenv('QUERY_CACHE_TTL', 0))
+        disk_cache_rows = int(os.getenv('DISK_CACHE_MAX_ROWS', 100000))
+        query_disk_cache = None
+        if cache_path:
+            query_disk_cache = DiskCache(
+                cache_path,
+                'query_embeddings',
+                encode=self._encode_vector,
+                decode=self._decode_vector,
+                ttl=query_cache_ttl,
+                max_rows=disk_cache_rows
+            )
+        self.embeddings_cache = LRUCache(
+            max_size=int(os.getenv('QUERY_CACHE_SIZE', 1024)),
+            ttl=query_cache_ttl,
+            disk=query_disk_cache
+        )
+        
+        chunk_disk_cache = None
+        if cache_path:
+            chunk_disk_cache = DiskCache(
+                cache_path,
+                'chunk_embeddings',
+                encode=self._encode_vector,
+                decode=self._decode_vector,
+                max_rows=disk_cache_rows
+            )
+        self.chunk_cache = LRUCache(
+            max_size=int(os.getenv('CHUNK_CACHE_SIZE', 1024)),
+            disk=chunk_disk_cache
+        )
     
-    def create_embeddings(self, transcript_data):
-        """Create embeddings for all transcript chunks"""
+    def create_embeddings(self, transcript_data, progress=None):
+        """Create embeddings for all transcript chunks.
+
+        Returns the chunks together with a single pre-normalized float32
+        matrix (one row per chunk), so retrieval is one matrix-vector product.
+        Chunk texts already embedded with the same model (in this or any
+        earlier video) are served from the content-addressed chunk cache and
+        only the misses are sent to the API. ``progress('embedding', fraction)``
+        is called as batches complete.
+        """
         chunks = transcript_data['chunks']
-        chunks_with_embeddings = []
+        progress = progress or (lambda stage, fraction=None: None)
+        progress('embedding', 0.0)
         
         logger.info(f"Creating embeddings for {len(chunks)} chunks")
         
         texts = [chunk['text'] for chunk in chunks]
         
         try:
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.embedding_model
-            )
-            
-            for i, chunk in enumerate(chunks):
-                chunk_with_embedding = chunk.copy()
-                chunk_with_embedding['embedding'] = response.data[i].embedding
-                chunks_with_embeddings.append(chunk_with_embedding)
+            vectors, errors, ledger = self._embed_chunks(texts, progress)
+            if errors:
+                raise next(iter(errors.values()))
+            embeddings = self._stack(vectors)
+            stats = self._chunk_stats(ledger, 0, len(texts))
             
-            logger.info(f"Successfully created {len(chunks_with_embeddings)} embeddings")
-            return chunks_with_embeddings
+            logger.info(
+                f"Successfully created {len(embeddings)} embeddings "
+                f"({stats['reused']} reused from cache, {stats['tokens_saved']} tokens saved)"
+            )
+            return {
+                'chunks': [chunk.copy() for chunk in chunks],
+                'embeddings': embeddings,
+                'stats': stats
+            }
             
         except Exception as e:
             logger.error(f"Error creating embeddings: {str(e)}")
             raise
     
+    def create_embeddings_many(self, transcripts, progress=None):
+        """Create embeddings for several videos at once.
+
+        The chunks of all videos are embedded together so request batches are
+        packed across video boundaries. Returns one entry per transcript (in
+        order) plus the aggregate stats. A request batch that fails only fails
+        the videos it carried: their entry is the exception instead of a result.
+
+        Each video's stats count the cache hits among its own chunks; a chunk
+        text shared by several videos is embedded for the first and reused by
+        the rest. Its ``tokens_used`` is its share of the billed tokens.
+        """
+        texts = [chunk['text'] for transcript_data in transcripts for chunk in transcript_data['chunks']]
+        vectors, errors, ledger = self._embed_chunks(texts, progress)
+        
+        results = []
+        offset = 0
+        for transcript_data in transcripts:
+            count = len(transcript_data['chunks'])
+            error = next((errors[i] for i in range(offset, offset + count) if i in errors), None)
+            if error is not None:
+                results.append(error)
+            else:
+                results.append({
+                    'chunks': [chunk.copy() for chunk in transcript_data['chunks']],
+                    'embeddings': self._stack(vectors[offset:offset + count]),
+                    'stats': self._chunk_stats(ledger, offset, offset + count)
+                })
+            offset += count
+        
+        if errors:
+            logger.warning(f"{sum(1 for result in results if isinstance(result, Exception))} of {len(results)} videos failed to embed")
+        return results, self._chunk_stats(ledger, 0, len(texts))
+    
+    def _embed_chunks(self, texts, progress=None):
+        """Vectors for chunk texts, served from the chunk cache where possible.
+
+        Returns ``(vectors, errors, ledger)``: ``errors`` maps the position of
+        each text whose request batch failed to the exception, and its vector
+        is None. Only successfully embedded texts are cached. ``ledger`` feeds
+        ``_chunk_stats`` for the whole list or any slice of it.
+        """
+        tokens = [self._count_tokens(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+        
+        for i, text in enumerate(texts):
+            cache_key = self._chunk_cache_key(text)
+            cached = self.chunk_cache.get(cache_key)
+            if cached is not None:
+                vectors[i] = cached
+            else:
+                missing.setdefault(cache_key, []).append(i)
+        
+        errors = {}
+        tokens_used = 0
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            miss_batches = self._plan_batches([tokens[positions[0]] for positions in missing.values()])
+            new_vectors, tokens_used, failed = self._embed_texts(miss_texts, miss_batches, progress)
+            
+            for j, (positions, vector) in enumerate(zip(missing.values(), new_vectors)):
+                for i in positions:
+                    if j in failed:
+                        errors[i] = failed[j]
+                    else:
+                        vectors[i] = vector
+            
+            # Copies, so a cached row does not keep its whole batch matrix alive
+            self.chunk_cache.set_many(
+                (cache_key, vector.copy()) for cache_key, vector in zip(missing.keys(), new_vectors)
+                if vector is not None
+            )
+        
+        embedded = [False] * len(texts)
+        for positions in missing.values():
+            embedded[positions[0]] = True
+        ledger = {
+            'tokens': tokens,
+            'embedded': embedded,
+            'tokens_used': tokens_used,
+            'embedded_tokens': sum(count for count, sent in zip(tokens, embedded) if sent)
+        }
+        return vectors, errors, ledger
+    
+    def _chunk_stats(self, ledger, start, end):
+        """Cache savings for the texts at positions start..end of an ``_embed_chunks`` call"""
+        tokens = ledger['tokens'][start:end]
+        embedded = ledger['embedded'][start:end]
+        sent_tokens = [count for count, sent in zip(tokens, embedded) if sent]
+        if sent_tokens and ledger['embedded_tokens']:
+            tokens_used = round(ledger['tokens_used'] * sum(sent_tokens) / ledger['embedded_tokens'])
+        else:
+            tokens_used = 0
+        return {
+            'chunks': end - start,
+            'embedded': len(sent_tokens),
+            'reused': end - start - len(sent_tokens),
+            'tokens_used': tokens_used,
+            'tokens_saved': sum(tokens) - sum(sent_tokens),
+            'requests_saved': max(0, len(self._plan_batches(tokens)) - len(self._plan_batches(sent_tokens)))
+        }
+    
+    @staticmethod
+    def _stack(vectors):
+        if vectors:
+            return np.vstack(vectors).astype(np.float32, copy=False)
+        return np.zeros((0, 0), dtype=np.float32)
+    
+    def _embed_texts(self, texts, batches, progress=None):
+        """Embed texts with the backend, returning normalized vectors, tokens used and failures.
+
+        ``batches`` (from ``_plan_batches``) are embedded concurrently on the
+        shared worker pool and reassembled in input order. When a batch still
+        fails after its retries, its texts get no vector and map to the
+        exception in the returned failures; the other batches are unaffected.
+        """
+        if len(batches) > 1:
+            logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches")
+        
+        futures = [
+            self.executor.submit(self._embed_batch, [texts[i] for i in batch])
+            for batch in batches
+        ]
+        
+        vectors = [None] * len(texts)
+        failed = {}
+        tokens_used = 0
+        for done, (batch, future) in enumerate(zip(batches, futures), 1):
+            try:
+                batch_vectors, batch_tokens = future.result()
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(batch)} texts failed: {str(e)}")
+                failed.update((i, e) for i in batch)
+            else:
+                for i, vector in zip(batch, batch_vectors):
+                    vectors[i] = vector
+                tokens_used += batch_tokens
+            if progress:
+                progress('embedding', done / len(futures))
+        
+        return vectors, tokens_used, failed
+    
+    def _plan_batches(self, token_counts):
+        """Group text indices into batches that respect per-request input and token limits, given each text's token count"""
+        batches = []
+        current = []
+        current_tokens = 0
+        
+        for i, count in enumerate(token_counts):
+            tokens = min(count, self.max_input_tokens)
+            
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            
+            current.append(i)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _embed_batch(self, texts):
+        """Embed a single batch, retrying with backoff on rate limits and transient errors"""
+        if self.backend.remote:
+            inputs = [truncate_tokens(text, self.max_input_tokens, self.embedding_model) for text in texts]
+        else:
+            # Local backends truncate (ONNX) or take any length (hashing) themselves
+            inputs = list(texts)
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                with span('embedding.request'):
+                    matrix, tokens_used = self.backend.embed(inputs)
+                self._count_request('success', tokens_used)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    self._count_request('error')
+                    raise
+                self._count_request('retry')
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        
+        return list(self._normalize(matrix)), tokens_used
+    
+    def _count_tokens(self, text):
+        """Token count for batch planning: tiktoken for remote models, a length estimate for local backends"""
+        if self.backend.remote:
+            return count_tokens(text, self.embedding_model)
+        return estimate_tokens(text)
+    
+    def _count_request(self, outcome, tokens=0):
+        if not self.backend.remote:
+            return
+        OPENAI_REQUESTS.inc(endpoint='embeddings', outcome=outcome)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, endpoint='embeddings', kind='prompt')
+    
+    @staticmethod
+    def _retry_delay(error, attempt):
+        """Backoff delay, honouring the server's Retry-After header when present"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            try:
+                if retry_after is not None:
+                    return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        return min(2 ** attempt, 30) * (0.5 + random.random() / 2)
+    
     def get_query_embedding(self, query):
-        """Get embedding for a query string"""
+        """Get the normalized embedding for a query string, served from cache when possible"""
+        cache_key = self._query_cache_key(query)
+        cached = self.embeddings_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.client.embeddings.create(
-                input=query,
-                model=self.embedding_model
-            )
-            return response.data[0].embedding
+            embedding = self._embed_batch([query])[0][0]
+            embedding.setflags(write=False)
+            
+            self.embeddings_cache.set(cache_key, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Error getting query embedding: {str(e)}")
             raise
     
-    def find_relevant_chunks(self, query, chunks_with_embeddings, top_k=5):
-        """Find most relevant chunks using cosine similarity"""
+    def cache_stats(self):
+        """Statistics for the embedding caches"""
+        return {
+            'query_embeddings': self.embeddings_cache.stats(),
+            'chunk_embeddings': self.chunk_cache.stats()
+        }
+    
+    def _chunk_cache_key(self, text):
+        return hashlib.sha256(f"{self.embedding_model}\0{text}".encode('utf-8')).hexdigest()
+    
+    def _query_cache_key(self, query):
+        normalized = re.sub(r'\s+', ' ', query).strip().lower()
+        return hashlib.sha256(f"{self.embedding_model}\0{normalized}".encode('utf-8')).hexdigest()
+    
+    def find_relevant_chunks(self, query, chunks, embeddings, top_k=5, lexical_index=None, mode='semantic'):
+        """Find the most relevant chunks for a query.
+
+        ``mode`` is 'semantic' (cosine similarity against the normalized
+        matrix), 'hybrid' (semantic and BM25 rankings fused with reciprocal
+        rank fusion) or 'lexical' (BM25 only, no embedding API call). Hybrid
+        and lexical modes need the video's ``lexical_index``; without one they
+        fall back to semantic. Quantized embeddings rescore their best
+        candidates at full precision.
+        """
         try:
+            if len(chunks) == 0:
+                return []
+            
+            top_k = max(1, min(int(top_k), len(chunks)))
+            if lexical_index is None:
+                mode = 'semantic'
+            
+            if mode == 'lexical':
+                hits = lexical_index.search(query, top_k)
+                best = hits[0][1] if hits else 1.0
+                
+                relevant_chunks = []
+                for idx, score in hits:
+                    chunk = chunks[idx].copy()
+                    chunk['lexical_score'] = score
+                    chunk['similarity'] = score / best
+                    relevant_chunks.append(chunk)
+                
+                logger.info(f"Found {len(relevant_chunks)} lexical matches for query")
+                return relevant_chunks
+            
             query_embedding = self.get_query_embedding(query)
             
-            chunk_embeddings = [chunk['embedding'] for chunk in chunks_with_embeddings]
-            similarities = cosine_similarity(
-                [query_embedding],
-                chunk_embeddings
-            )[0]
+            if embeddings.shape[-1] != len(query_embedding):
+                logger.warning(
+                    f"Stored embeddings have dimension {embeddings.shape[-1]} but {self.embedding_model} "
+                    f"produces {len(query_embedding)}; re-process the video to search it semantically"
+                )
+                if lexical_index is None:
+                    raise ValueError("Video was embedded with a different embedding model")
+                return self.find_relevant_chunks(query, chunks, embeddings, top_k, lexical_index, mode='lexical')
             
-            top_indices = np.argsort(similarities)[-top_k:][::-1]
+            similarities = embeddings @ query_embedding
+            depth = min(max(top_k * 4, 50), len(chunks)) if mode == 'hybrid' else top_k
+            if isinstance(embeddings, QuantizedEmbeddings):
+                similarities = embeddings.rescore(similarities, query_embedding, depth, self.rescore_factor)
+            
+            if mode == 'hybrid':
+                lexical_hits = lexical_index.search(query, depth)
+                fused = reciprocal_rank_fusion([
+                    self._top_indices(similarities, depth),
+                    [idx for idx, _ in lexical_hits]
+                ])
+                top_indices = sorted(fused, key=fused.get, reverse=True)[:top_k]
+                lexical_scores = dict(lexical_hits)
+            else:
+                top_indices = self._top_indices(similarities, top_k)
             
             relevant_chunks = []
             for idx in top_indices:
-                chunk = chunks_with_embeddings[idx].copy()
+                chunk = chunks[idx].copy()
                 chunk['similarity'] = float(similarities[idx])
+                if mode == 'hybrid':
+                    chunk['lexical_score'] = lexical_scores.get(idx, 0.0)
+                    chunk['fusion_score'] = fused[idx]
                 relevant_chunks.append(chunk)
             
             logger.info(f"Found {len(relevant_chunks)} relevant chunks for query")
@@ -76,3 +421,40 @@ class EmbeddingsManager:
         except Exception as e:
             logger.error(f"Error finding relevant chunks: {str(e)}")
             raise
+    
+    def score_chunks(self, query, embeddings, indices):
+        """Cosine similarity of the query to selected chunks, or None if the dimensions differ"""
+        query_embedding = self.get_query_embedding(query)
+        if embeddings.shape[-1] != len(query_embedding):
+            return None
+        
+        indices = np.asarray(indices, dtype=np.int64)
+        if isinstance(embeddings, QuantizedEmbeddings):
+            rows = embeddings.rows(indices)
+        else:
+            rows = np.asarray(embeddings[indices], dtype=np.float32)
+        return rows @ query_embedding
+    
+    @staticmethod
+    def _top_indices(scores, top_k):
+        """Indices of the top_k highest scores, best first"""
+        if top_k < len(scores):
+            top_indices = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            top_indices = np.arange(len(scores))
+        return [int(i) for i in top_indices[np.argsort(scores[top_indices])[::-1]]]
+    
+    @staticmethod
+    def _encode_vector(vector):
+        return np.asarray(vector, dtype=np.float32).tobytes()
+    
+    @staticmethod
+    def _decode_vector(data):
+        return np.frombuffer(data, dtype=np.float32)
+    
+    @staticmethod
+    def _normalize(vectors):
+        """L2-normalize a vector or each row of a matrix"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
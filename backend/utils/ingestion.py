@@ -0,0 +1,253 @@
+import os
+import time
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .job_manager import JobError
+from .lexical_index import BM25Index
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+class IngestionError(JobError):
+    """A video that cannot be ingested (no captions, fetch failure, ...)"""
+
+
+class VideoIngestor:
+    """Fetches, chunks and embeds videos and stores the results"""
+
+    def __init__(self, transcript_fetcher, embeddings_manager, video_store, vector_index=None, job_manager=None):
+        self.transcript_fetcher = transcript_fetcher
+        self.embeddings_manager = embeddings_manager
+        self.video_store = video_store
+        self.vector_index = vector_index
+        self.job_manager = job_manager
+        self.window_chunks = int(os.getenv('INGEST_WINDOW_CHUNKS', 2048))
+
+    def ingest(self, video_id, progress=None):
+        """Run the full ingestion pipeline for a video.
+
+        ``progress(stage, fraction=None)`` is called as the pipeline moves
+        through the fetching, parsing, chunking, embedding and storing stages.
+        """
+        progress = progress or (lambda stage, fraction=None: None)
+
+        with span('ingest.fetch'):
+            transcript_data = self._fetch(video_id, progress)
+        with span('ingest.embed'):
+            embedded = self.embeddings_manager.create_embeddings(transcript_data, progress=progress)
+
+        progress('storing')
+        with span('ingest.store'):
+            return self._store(video_id, transcript_data, embedded)
+
+    def ingest_many(self, video_ids, concurrency=4, progress=None):
+        """Ingest many videos, packing their embedding requests into shared batches.
+
+        Transcripts are fetched with at most ``concurrency`` videos in flight.
+        Fetched videos fill a window; once it holds INGEST_WINDOW_CHUNKS chunks,
+        or fetching is done, its chunks are embedded together so request
+        batches fill across video boundaries, and each of its videos is stored
+        as soon as the window returns. Fetching carries on while a window is
+        embedded. A failed request batch fails only the videos it carried.
+
+        With a job manager, each pending video is claimed under its id, the
+        key of single-video jobs, so a request to process one of them joins
+        this batch instead of repeating the work; a video another job is
+        already ingesting is left to it and reported as ``processing`` with
+        that job's id. Returns per-video results plus aggregate throughput.
+        """
+        progress = progress or (lambda stage, fraction=None: None)
+        started = time.perf_counter()
+
+        results = {}
+        pending = []
+        claims = {}
+        for video_id in dict.fromkeys(video_ids):
+            if video_id in self.video_store:
+                results[video_id] = {'video_id': video_id, 'status': 'already_processed'}
+                continue
+            if self.job_manager is not None:
+                job, claimed = self.job_manager.claim(video_id)
+                if not claimed:
+                    results[video_id] = {'video_id': video_id, 'status': 'processing', 'job_id': job.id}
+                    continue
+                claims[video_id] = job
+            pending.append(video_id)
+
+        unsettled = set(pending)
+
+        def settle(video_id, stored=None, error=None):
+            if error is not None:
+                results[video_id] = self._failure(video_id, error)
+            else:
+                results[video_id] = {
+                    'video_id': video_id,
+                    'status': 'processed',
+                    'chunks_count': stored['chunks_count']
+                }
+            job = claims.pop(video_id, None)
+            if job is not None:
+                self.job_manager.finish(job, result=stored, error=error)
+            unsettled.discard(video_id)
+            progress('ingesting', 1 - len(unsettled) / len(pending))
+
+        embedding_stats = None
+        embed_seconds = 0.0
+        fetch_seconds = 0.0
+
+        def flush(window):
+            nonlocal embedding_stats, embed_seconds
+            embed_started = time.perf_counter()
+            try:
+                with span('ingest.embed'):
+                    embedded_videos, stats = self.embeddings_manager.create_embeddings_many(
+                        [transcript_data for _, transcript_data in window]
+                    )
+            except Exception as e:
+                logger.error(f"Batch embedding failed: {str(e)}", exc_info=True)
+                for video_id, _ in window:
+                    settle(video_id, error=e)
+                return
+            finally:
+                embed_seconds += time.perf_counter() - embed_started
+
+            embedding_stats = stats if embedding_stats is None else {
+                key: embedding_stats[key] + value for key, value in stats.items()
+            }
+            for (video_id, transcript_data), embedded in zip(window, embedded_videos):
+                if isinstance(embedded, Exception):
+                    settle(video_id, error=embedded)
+                    continue
+                try:
+                    with span('ingest.store'):
+                        stored = self._store(video_id, transcript_data, embedded)
+                except Exception as e:
+                    settle(video_id, error=e)
+                else:
+                    settle(video_id, stored=stored)
+
+        try:
+            if pending:
+                progress('ingesting', 0.0)
+                queue = iter(pending)
+                window = []
+                window_chunks = 0
+                with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='ingest') as executor:
+                    in_flight = {}
+
+                    def refill():
+                        for video_id in islice(queue, max(1, concurrency) - len(in_flight)):
+                            in_flight[executor.submit(self._timed_fetch, video_id)] = video_id
+
+                    refill()
+                    while in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            video_id = in_flight.pop(future)
+                            try:
+                                transcript_data = future.result()
+                            except Exception as e:
+                                settle(video_id, error=e)
+                                continue
+                            window.append((video_id, transcript_data))
+                            window_chunks += len(transcript_data['chunks'])
+
+                        refill()
+                        if window_chunks >= self.window_chunks:
+                            flush(window)
+                            window = []
+                            window_chunks = 0
+
+                fetch_seconds = time.perf_counter() - started
+                if window:
+                    flush(window)
+        finally:
+            for job in claims.values():
+                self.job_manager.finish(job, error=IngestionError(
+                    "Batch ingestion stopped",
+                    "The batch this video belonged to stopped before processing it."
+                ))
+
+        elapsed = time.perf_counter() - started
+        ordered = [results[video_id] for video_id in dict.fromkeys(video_ids)]
+        processed = [result for result in ordered if result['status'] == 'processed']
+        chunks = sum(result['chunks_count'] for result in processed)
+
+        summary = {
+            'videos': len(ordered),
+            'processed': len(processed),
+            'already_processed': sum(1 for result in ordered if result['status'] == 'already_processed'),
+            'processing': sum(1 for result in ordered if result['status'] == 'processing'),
+            'failed': sum(1 for result in ordered if result['status'] == 'failed'),
+            'chunks': chunks,
+            'elapsed_seconds': round(elapsed, 3),
+            'fetch_seconds': round(fetch_seconds, 3),
+            'embed_seconds': round(embed_seconds, 3),
+            'videos_per_second': round(len(processed) / elapsed, 3) if elapsed else 0.0,
+            'chunks_per_second': round(chunks / elapsed, 3) if elapsed else 0.0,
+            'embedding_stats': embedding_stats
+        }
+
+        logger.info(
+            f"Batch ingestion: {summary['processed']} processed, {summary['failed']} failed, "
+            f"{summary['already_processed']} already processed in {summary['elapsed_seconds']}s"
+        )
+
+        return {'results': ordered, 'summary': summary}
+
+    def _timed_fetch(self, video_id):
+        with span('ingest.fetch'):
+            return self._fetch(video_id)
+
+    def _fetch(self, video_id, progress=None):
+        """Check availability and fetch the chunked transcript"""
+        progress = progress or (lambda stage, fraction=None: None)
+
+        progress('fetching')
+        availability = self.transcript_fetcher.check_transcript_availability(video_id)
+        if not availability['available']:
+            error_detail = availability.get('error', 'Unknown error')
+            logger.error(f"Transcript not available for {video_id}: {error_detail}")
+            raise IngestionError(
+                "Transcript not available for this video",
+                "This video may not have captions enabled, may be private/restricted, or may have transcript access disabled by the creator."
+            )
+
+        logger.info(f"Available transcript languages for {video_id}: {availability['languages']}")
+
+        transcript_data = self.transcript_fetcher.fetch_transcript(video_id, progress=progress)
+        if not transcript_data:
+            raise IngestionError(
+                "Could not fetch transcript",
+                "The video transcript could not be retrieved. Please ensure the video has captions/subtitles available."
+            )
+
+        return transcript_data
+
+    def _store(self, video_id, transcript_data, embedded):
+        self.video_store[video_id] = {
+            'info': dict(transcript_data['info'], embedding_model=self.embeddings_manager.embedding_model),
+            'chunks': embedded['chunks'],
+            'embeddings': embedded['embeddings'],
+            'lexical_index': transcript_data.get('lexical_index') or BM25Index(
+                [chunk['text'] for chunk in embedded['chunks']]
+            )
+        }
+        if self.vector_index is not None:
+            self.vector_index.add(video_id, embedded['embeddings'])
+
+        logger.info(f"Successfully processed video {video_id} with {len(embedded['chunks'])} chunks")
+
+        return {
+            'video_id': video_id,
+            'video_info': transcript_data['info'],
+            'chunks_count': len(embedded['chunks']),
+            'embedding_stats': embedded['stats']
+        }
+
+    def _failure(self, video_id, error):
+        if isinstance(error, JobError):
+            return {'video_id': video_id, 'status': 'failed', 'error': error.error, 'details': error.details}
+        logger.error(f"Error ingesting {video_id}: {str(error)}")
+        return {'video_id': video_id, 'status': 'failed', 'error': 'Internal server error', 'details': str(error)}
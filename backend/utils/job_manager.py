@@ -0,0 +1,272 @@
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobError(Exception):
+    """Expected job failure, reported to clients as an error message plus details"""
+
+    def __init__(self, error, details=None):
+        super().__init__(error)
+        self.error = error
+        self.details = details
+
+
+class Job:
+    """A background job with stage-level progress"""
+
+    def __init__(self, key, listener=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.details = None
+        self.unexpected_error = False
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.listener = listener
+        self._done = threading.Event()
+
+    def update(self, stage, progress=None):
+        """Report the current stage and, optionally, progress within it (0-1)"""
+        self.stage = stage
+        self.progress = min(max(float(progress), 0.0), 1.0) if progress is not None else 0.0
+        self.updated_at = time.time()
+        logger.info(f"Job {self.id} ({self.key}): {stage}" + (f" {self.progress:.0%}" if progress is not None else ''))
+        if self.listener is not None:
+            self.listener(self)
+
+    def wait(self, timeout=None):
+        """Block until the job has finished"""
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+        if self.result is not None:
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+            data['details'] = self.details
+        return data
+
+
+class RemoteJob:
+    """A job run by another worker process, followed through the shared cache"""
+
+    def __init__(self, job_id, key, shared, poll_interval=0.5):
+        self.id = job_id
+        self.key = key
+        self.shared = shared
+        self.poll_interval = poll_interval
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.details = None
+        self.unexpected_error = False
+        self.refresh()
+
+    def refresh(self):
+        """Reload the job's status; a job whose record and claim are both gone is failed"""
+        data = self.shared.get(self.id)
+        if data is None:
+            if self.shared.get(JobManager.claim_key(self.key)) != self.id:
+                self.status = 'failed'
+                self.error = 'Internal server error'
+                self.details = 'The worker running this job stopped reporting on it.'
+                self.unexpected_error = True
+            return
+        self.status = data['status']
+        self.result = data.get('result')
+        self.error = data.get('error')
+        self.details = data.get('details')
+        self.unexpected_error = self.error == 'Internal server error'
+
+    def wait(self, timeout=None):
+        """Poll until the job has finished"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self.finished:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+            self.refresh()
+        return True
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+
+class JobManager:
+    """Runs jobs on a thread pool and coalesces concurrent submissions per key.
+
+    While a job for a key is queued or running, submitting the same key again
+    returns the existing job instead of starting a duplicate. Finished jobs are
+    kept for ``retention`` seconds so clients can poll their outcome.
+
+    Work done outside the pool (a batch ingesting many videos, say) can
+    ``claim`` the key of each item it takes on and ``finish`` it when done, so
+    submissions for those keys coalesce onto it in the meantime.
+
+    With a ``shared`` DiskCache, every status change is also published there,
+    so any worker process can report on a job started by another, and a key
+    is claimed there before its job starts: while another process holds the
+    claim, submitting the key returns a ``RemoteJob`` for that process's job.
+    """
+
+    def __init__(self, max_workers=4, retention=3600, shared=None):
+        self.retention = retention
+        self.shared = shared
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jobs')
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Queue fn(job, *args, **kwargs); returns (job, created)"""
+        with self._lock:
+            self._prune()
+
+            active = self._active.get(key)
+            if active is not None:
+                logger.info(f"Coalescing submission for {key} onto job {active.id}")
+                return active, False
+
+            job = Job(key, listener=self._publish if self.shared is not None else None)
+            owner = self._claim_shared(job)
+            if owner is not None:
+                logger.info(f"Coalescing submission for {key} onto job {owner.id} of another worker")
+                return owner, False
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        self._publish(job)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def claim(self, key):
+        """Register a running job for work the caller does itself; returns (job, claimed).
+
+        If a job for ``key`` is already queued or running it is returned with
+        claimed False and the caller should leave the work to it. Otherwise the
+        caller owns the new job and must complete it with ``finish``.
+        """
+        with self._lock:
+            self._prune()
+
+            active = self._active.get(key)
+            if active is not None:
+                return active, False
+
+            job = Job(key, listener=self._publish if self.shared is not None else None)
+            owner = self._claim_shared(job)
+            if owner is not None:
+                return owner, False
+            job.status = 'running'
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        self._publish(job)
+        return job, True
+
+    def finish(self, job, result=None, error=None):
+        """Complete a job with its result, or fail it with the exception that stopped it"""
+        try:
+            if error is None:
+                job.result = result
+                job.status = 'completed'
+                job.update('completed', 1.0)
+            elif isinstance(error, JobError):
+                job.status = 'failed'
+                job.error = error.error
+                job.details = error.details
+                job.update('failed')
+                logger.error(f"Job {job.id} ({job.key}) failed: {error.error}")
+            else:
+                job.status = 'failed'
+                job.error = 'Internal server error'
+                job.details = str(error)
+                job.unexpected_error = True
+                job.update('failed')
+                logger.error(f"Job {job.id} ({job.key}) failed: {str(error)}", exc_info=error)
+        finally:
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            if self.shared is not None:
+                self.shared.delete(self.claim_key(job.key), job.id)
+            job._done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Status dict of a job started by this or, with a shared cache, any other process"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.shared is not None:
+            status = self.shared.get(job_id)
+            if isinstance(status, dict):
+                return status
+        return None
+
+    @staticmethod
+    def claim_key(key):
+        """Shared cache entry holding the id of the job that owns ``key``"""
+        return f"claim:{key}"
+
+    def _claim_shared(self, job):
+        """Claim the job's key across processes; returns the owning job if another process holds it"""
+        if self.shared is None:
+            return None
+        owner = self.shared.add(self.claim_key(job.key), job.id, stale=self._finished_elsewhere)
+        if owner == job.id:
+            return None
+        return RemoteJob(owner, job.key, self.shared)
+
+    def _finished_elsewhere(self, job_id):
+        # A claim outlives its job only if the owner died before releasing it
+        status = self.shared.get(job_id)
+        return isinstance(status, dict) and status['status'] in ('completed', 'failed')
+
+    def _publish(self, job):
+        if self.shared is not None:
+            self.shared.set(job.id, job.to_dict())
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        self._publish(job)
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            self.finish(job, error=e)
+        else:
+            self.finish(job, result=result)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
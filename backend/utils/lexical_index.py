@@ -0,0 +1,91 @@
+import re
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+
+# Rough cost of a posting list's dict entry and array headers, on top of its data
+POSTING_OVERHEAD_BYTES = 300
+
+def tokenize(text):
+    """Lowercase word tokens; keeps numbers, decimals and contractions intact"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of ids into {id: score} with reciprocal rank fusion"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return scores
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over a video's chunk texts.
+
+    BM25 term weights do not depend on the query, so each posting list stores
+    its final per-document weight at build time and a query is just a few
+    vectorized scatter-adds, with no network call.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.size = len(texts)
+        self._postings = {}
+
+        if not texts:
+            return
+
+        doc_terms = [tokenize(text) for text in texts]
+        doc_lengths = np.array([len(terms) for terms in doc_terms], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) or 1.0
+
+        term_docs = {}
+        for doc_id, terms in enumerate(doc_terms):
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                term_docs.setdefault(term, ([], []))
+                term_docs[term][0].append(doc_id)
+                term_docs[term][1].append(count)
+
+        norms = k1 * (1 - b + b * doc_lengths / avg_length)
+        for term, (docs, counts) in term_docs.items():
+            docs = np.array(docs, dtype=np.int32)
+            tf = np.array(counts, dtype=np.float32)
+            idf = np.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            self._postings[term] = (docs, (idf * tf * (k1 + 1) / (tf + norms[docs])).astype(np.float32))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the posting lists"""
+        return sum(
+            docs.nbytes + weights.nbytes + len(term) + POSTING_OVERHEAD_BYTES
+            for term, (docs, weights) in self._postings.items()
+        )
+
+    def scores(self, query):
+        """BM25 score of every document for the query"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def search(self, query, top_k=10):
+        """Return [(doc_index, score), ...] for documents matching the query, best first"""
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores > 0)
+        if len(matching) == 0:
+            return []
+
+        k = min(top_k, len(matching))
+        top = matching[np.argpartition(scores[matching], -k)[-k:]]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(i), float(scores[i])) for i in top]
@@ -0,0 +1,199 @@
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(_label_key(self.labelnames, labels)) or ([0], 0.0)
+            return sum(counts)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        for key, counts, total in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Besides counters and histograms updated in place, collectors registered
+    with ``add_collector`` are called at render time and return
+    ``(name, type, help, [(labels, value), ...])`` tuples, which suits
+    values other components already track, such as cache statistics.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(_render_family(metric.name, metric.type, metric.help, metric.samples()))
+
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+                continue
+            for name, metric_type, help, values in families:
+                lines.extend(_render_family(name, metric_type, help, [(name, labels, value) for labels, value in values]))
+
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'youtube_twin_stage_seconds', 'Duration of pipeline stages', ('stage', 'outcome')
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'youtube_twin_http_request_seconds', 'HTTP request latency by route', ('method', 'route', 'status')
+)
+OPENAI_REQUESTS = registry.counter(
+    'youtube_twin_openai_requests_total', 'OpenAI API calls', ('endpoint', 'outcome')
+)
+OPENAI_TOKENS = registry.counter(
+    'youtube_twin_openai_tokens_total', 'Tokens reported by the OpenAI API', ('endpoint', 'kind')
+)
+TRANSCRIPT_FETCHES = registry.counter(
+    'youtube_twin_transcript_fetches_total', 'Transcript fetch attempts by method (yt-dlp is the fallback)', ('method', 'outcome')
+)
+CAPTION_VARIANTS = registry.counter(
+    'youtube_twin_caption_variant_attempts_total', 'Caption URL variant attempts', ('variant', 'outcome')
+)
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage into youtube_twin_stage_seconds and log it as key=value pairs"""
+    started = time.perf_counter()
+    outcome = 'success'
+    try:
+        yield
+    except GeneratorExit:
+        outcome = 'cancelled'
+        raise
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+        logger.debug(f"span stage={stage} outcome={outcome} seconds={elapsed:.4f}")
+
+def record_openai_usage(endpoint, usage, outcome='success'):
+    """Count an OpenAI call and the prompt/completion tokens it reported"""
+    OPENAI_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+    if usage is None:
+        return
+    for kind in ('prompt_tokens', 'completion_tokens'):
+        tokens = getattr(usage, kind, None)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, endpoint=endpoint, kind=kind.split('_')[0])
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _render_family(name, metric_type, help, samples):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"]
+    for sample_name, labels, value in samples:
+        if labels:
+            rendered = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            lines.append(f"{sample_name}{{{rendered}}} {_format_value(value)}")
+        else:
+            lines.append(f"{sample_name} {_format_value(value)}")
+    return lines
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
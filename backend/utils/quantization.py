@@ -0,0 +1,100 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORAGE_MODES = ('float32', 'float16', 'int8')
+
+class QuantizedEmbeddings:
+    """A compact, read-only embedding matrix with optional full-precision rescoring.
+
+    Rows are held in memory as float16 or as int8 codes with one float32
+    scale per row (symmetric, ``max|x| / 127``), 2x or 4x smaller than
+    float32. ``matrix @ query`` returns approximate scores; ``rescore``
+    recomputes the best candidates exactly from ``full``, typically the
+    memory-mapped float32 file on disk, so only those rows are ever paged in.
+    Converting with ``np.asarray`` dequantizes.
+    """
+
+    BLOCK_ROWS = 256
+
+    def __init__(self, codes, scales=None, full=None):
+        self.codes = codes
+        self.scales = scales
+        self.full = full
+        self.storage = 'int8' if codes.dtype == np.int8 else 'float16'
+
+    @classmethod
+    def quantize(cls, embeddings, storage, full=None):
+        """Quantize a float32 matrix to 'float16' or 'int8'"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if storage == 'float16':
+            return cls(embeddings.astype(np.float16), full=full)
+
+        scales = np.abs(embeddings).max(axis=1) / 127.0 if len(embeddings) else np.zeros(0, dtype=np.float32)
+        scales = scales.astype(np.float32)
+        safe = np.where(scales == 0, 1.0, scales)[:, None]
+        codes = np.clip(np.rint(embeddings / safe), -127, 127).astype(np.int8)
+        return cls(codes, scales, full=full)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        """Resident bytes of the quantized codes and scales"""
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = self.codes.astype(np.float32)
+        if self.scales is not None:
+            matrix *= self.scales[:, None]
+        return matrix if dtype is None else matrix.astype(dtype, copy=False)
+
+    def __matmul__(self, query):
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.BLOCK_ROWS):
+            block = self.codes[start:start + self.BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def rows(self, indices):
+        """Selected rows as float32, exact when full precision is available"""
+        if self.full is not None:
+            return np.asarray(self.full[indices], dtype=np.float32)
+        matrix = self.codes[indices].astype(np.float32)
+        if self.scales is not None:
+            matrix *= self.scales[indices][:, None]
+        return matrix
+
+    def rescore(self, scores, query, depth, factor=4):
+        """Replace the approximate scores of the top ``depth * factor`` rows with exact ones"""
+        if self.full is None or len(scores) == 0:
+            return scores
+
+        count = min(len(scores), max(depth * factor, 32))
+        if count < len(scores):
+            candidates = np.sort(np.argpartition(scores, -count)[-count:])
+        else:
+            candidates = np.arange(len(scores))
+
+        scores = scores.copy()
+        scores[candidates] = np.asarray(self.full[candidates], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+        return scores
+
+
+def recall_at_k(exact_scores, approximate_scores, k):
+    """Fraction of the exact top-k rows (per query row) found in the approximate top-k"""
+    k = min(k, exact_scores.shape[-1])
+    exact = np.argpartition(exact_scores, -k, axis=-1)[..., -k:]
+    approximate = np.argpartition(approximate_scores, -k, axis=-1)[..., -k:]
+    return float(np.mean([
+        len(np.intersect1d(e, a, assume_unique=True)) / k for e, a in zip(exact, approximate)
+    ]))
@@ -0,0 +1,62 @@
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=16)
+def _get_encoding(model):
+    """Resolve the tiktoken encoding for a model, or None if unavailable"""
+    if tiktoken is None:
+        logger.warning(
+            f"tiktoken is not installed; estimating {model} token counts as characters/{CHARS_PER_TOKEN}, "
+            f"which can overfill embedding batches and chat context budgets"
+        )
+        return None
+    # Failures return None, which lru_cache keeps, so a missing BPE file is
+    # not downloaded again for every text
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        logger.warning(
+            f"Could not load tokenizer for {model}: {str(e)}; "
+            f"estimating token counts as characters/{CHARS_PER_TOKEN}"
+        )
+        return None
+
+def count_tokens(text, model=None):
+    """Count tokens with tiktoken when installed, otherwise estimate from length"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model or 'cl100k_base')
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return estimate_tokens(text)
+
+def estimate_tokens(text):
+    """Estimate a token count from length alone, without loading a tokenizer"""
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+def truncate_tokens(text, max_tokens, model=None):
+    """Truncate text so it fits within max_tokens"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = _get_encoding(model or 'cl100k_base')
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    return text[:max_tokens * CHARS_PER_TOKEN]
@@ -1,28 +1,60 @@
 import re
 import os
+import bisect
 import logging
 import json
-import requests
-import xml.etree.ElementTree as ET
+import httpx
 from urllib.parse import urlparse, parse_qs, urlencode
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .cache import LRUCache
+from .lexical_index import BM25Index
+from .captions import iter_caption_entries
+from .metrics import span, TRANSCRIPT_FETCHES, CAPTION_VARIANTS
 
 logger = logging.getLogger(__name__)
 
+SENTENCE_END_PATTERN = re.compile(r'[.!?\u2026]["\'\u201d\u2019)\]]*$')
+
 class TranscriptFetcher:
     def __init__(self):
         self.chunk_duration = int(os.getenv('CHUNK_DURATION', 30))
         self.chunk_overlap = int(os.getenv('CHUNK_OVERLAP', 5))
+        # Extra seconds a chunk may run to end on a sentence or pause (0 = cut at CHUNK_DURATION)
+        self.chunk_snap_slack = float(os.getenv('CHUNK_SNAP_SLACK', 0))
+        self.chunk_pause_gap = float(os.getenv('CHUNK_PAUSE_GAP', 1.5))
+        # Point at a stand-in server (see benchmarks/fake_services.py) to run offline
+        self.youtube_base_url = os.getenv('YOUTUBE_BASE_URL', 'https://www.youtube.com').rstrip('/')
+        
+        # One pooled, thread-safe client for every YouTube request, so
+        # concurrent ingestions reuse keep-alive connections
+        pool_size = int(os.getenv('HTTP_POOL_SIZE', 64))
+        self.http_client = httpx.Client(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            },
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            follow_redirects=True
+        )
         
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        })
+        self.caption_timeout = float(os.getenv('CAPTION_TIMEOUT', 10))
+        self.caption_hedge_delay = float(os.getenv('CAPTION_HEDGE_DELAY', 0.25))
+        self.caption_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('CAPTION_PROBE_WORKERS', 32)),
+            thread_name_prefix='captions'
+        )
+        self.caption_variant_stats = {}
+        self._stats_lock = threading.Lock()
+        
+        self.watch_page_cache = LRUCache(
+            max_size=int(os.getenv('WATCH_PAGE_CACHE_SIZE', 256)),
+            ttl=float(os.getenv('WATCH_PAGE_CACHE_TTL', 300))
+        )
     
     def extract_video_id(self, url):
-        """Extract video ID from YouTube URL"""
+        """Extract video ID from YouTube URL (a bare 11-character ID is accepted too)"""
         patterns = [
             r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)',
             r'youtube\.com\/embed\/([^&\n?#]+)',
@@ -33,46 +65,56 @@ class TranscriptFetcher:
             match = re.search(pattern, url)
             if match:
                 return match.group(1)
+        
+        if re.fullmatch(r'[A-Za-z0-9_-]{11}', url.strip()):
+            return url.strip()
         return None
     
-    def fetch_transcript(self, video_id):
-        """Fetch transcript using multiple methods"""
+    def fetch_transcript(self, video_id, progress=None):
+        """Fetch transcript using multiple methods.
+
+        ``progress(stage)`` is called when moving to the fetching, parsing and
+        chunking stages.
+        """
+        progress = progress or (lambda stage, fraction=None: None)
         
         try:
-            result = self._fetch_with_requests(video_id)
+            result = self._fetch_with_requests(video_id, progress)
+            TRANSCRIPT_FETCHES.inc(method='http', outcome='success' if result else 'failure')
             if result:
                 return result
         except Exception as e:
+            TRANSCRIPT_FETCHES.inc(method='http', outcome='error')
             logger.warning(f"Requests method failed: {str(e)}")
         
         try:
-            result = self._fetch_with_ytdlp(video_id)
+            with span('youtube.ytdlp'):
+                result = self._fetch_with_ytdlp(video_id, progress)
+            TRANSCRIPT_FETCHES.inc(method='ytdlp', outcome='success' if result else 'failure')
             if result:
                 return result
         except Exception as e:
+            TRANSCRIPT_FETCHES.inc(method='ytdlp', outcome='error')
             logger.warning(f"yt-dlp method failed: {str(e)}")
         
         logger.error(f"All methods failed for video {video_id}")
         return None
     
-    def _fetch_with_requests(self, video_id):
-        """Fetch using requests session"""
+    def _fetch_with_requests(self, video_id, progress):
+        """Fetch using the pooled HTTP client"""
         try:
-            logger.info(f"Fetching transcript for {video_id} using requests")
+            logger.info(f"Fetching transcript for {video_id} using the pooled HTTP client")
+            progress('fetching')
             
-            video_url = f'https://www.youtube.com/watch?v={video_id}'
+            video_url = f'{self.youtube_base_url}/watch?v={video_id}'
             
-            logger.info("Fetching video page...")
-            response = self.session.get(video_url, timeout=30)
+            page = self.get_watch_page(video_id)
             
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch video page: {response.status_code}")
+            if page.get('error'):
+                logger.error(f"Failed to fetch video page: {page['error']}")
                 return None
             
-            html = response.text
-            logger.info(f"Got video page ({len(html)} bytes)")
-            
-            caption_url = self._extract_caption_url(html, video_id)
+            caption_url = page['caption_url']
             
             if not caption_url:
                 logger.error("Could not find caption URL")
@@ -80,8 +122,6 @@ class TranscriptFetcher:
             
             logger.info(f"Caption URL: {caption_url[:150]}...")
             
-            from urllib.parse import urlparse, parse_qs, urlencode
-            
             parsed = urlparse(caption_url)
             params = parse_qs(parsed.query)
             
@@ -96,74 +136,44 @@ class TranscriptFetcher:
             
             logger.info(f"Trying with clean URL: {clean_url}")
             
-            urls_to_try = [
-                caption_url, 
-                clean_url, 
-                f"https://www.youtube.com/api/timedtext?v={video_id}&lang=en&fmt=json3",  
-                f"https://www.youtube.com/api/timedtext?v={video_id}&lang=en",  
+            variants = [
+                ('track', caption_url),
+                ('clean', clean_url),
+                ('json3', f"{self.youtube_base_url}/api/timedtext?v={video_id}&lang=en&fmt=json3"),
+                ('xml', f"{self.youtube_base_url}/api/timedtext?v={video_id}&lang=en"),
             ]
             
-            caption_data = None
-            
-            for idx, url in enumerate(urls_to_try):
-                try:
-                    logger.info(f"Attempt {idx + 1}: Trying URL variation")
-                    time.sleep(1)  
-                    
-                    caption_response = self.session.get(
-                        url,
-                        headers={
-                            'Referer': video_url,
-                            'Accept': '*/*',
-                            'Accept-Language': 'en-US,en;q=0.9',
-                        },
-                        timeout=30
-                    )
-                    
-                    if caption_response.status_code == 200:
-                        caption_data = caption_response.text
-                        
-                        if len(caption_data) > 10:
-                            logger.info(f"Success! Got caption data ({len(caption_data)} bytes)")
-                            break
-                        else:
-                            logger.warning(f"Attempt {idx + 1}: Got empty response")
-                    else:
-                        logger.warning(f"Attempt {idx + 1}: HTTP {caption_response.status_code}")
-                        
-                except Exception as e:
-                    logger.warning(f"Attempt {idx + 1} error: {str(e)}")
-                    continue
+            with span('youtube.captions'):
+                caption_data = self._probe_caption_urls(variants, video_url)
             
             if not caption_data or len(caption_data) < 10:
                 logger.error("All caption URL variations failed")
                 return None
             
-           
-            if 'json3' in caption_url or caption_data.strip().startswith('{'):
-                transcript_list = self._parse_json3_captions(caption_data)
-            else:
-                transcript_list = self._parse_xml_captions(caption_data)
+            progress('parsing')
+            entries = iter_caption_entries(caption_data)
+            
+            progress('chunking')
+            with span('captions.parse_chunk'):
+                chunks = self._create_chunks_with_timestamps(entries)
             
-            if not transcript_list:
+            if not chunks:
                 logger.error("Failed to parse transcript")
                 return None
             
-            logger.info(f"Parsed {len(transcript_list)} transcript entries")
-            
-            chunks = self._create_chunks_with_timestamps(transcript_list)
-            
             return {
                 'video_id': video_id,
                 'info': {
                     'video_id': video_id,
                     'video_url': f'https://www.youtube.com/watch?v={video_id}',
-                    'transcript_type': 'requests-session'
+                    'transcript_type': 'requests-session',
+                    **page['metadata']
                 },
-                'chunks': chunks
+                'chunks': chunks,
+                'lexical_index': BM25Index([chunk['text'] for chunk in chunks])
             }
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error: {str(e)}")
             return None
         except Exception as e:
@@ -172,12 +182,105 @@ class TranscriptFetcher:
             logger.debug(traceback.format_exc())
             raise
     
-    def _fetch_with_ytdlp(self, video_id):
+    def _probe_caption_urls(self, variants, referer):
+        """Race caption URL variants and return the first valid payload.
+
+        Variants are started in order of their historical success rate, each
+        one CAPTION_HEDGE_DELAY seconds after the previous, or as soon as the
+        previous ones have all failed (0 starts them all at once). The delays
+        are waited out here, in the calling thread, so pool threads only ever
+        run requests. As soon as one returns usable data the rest are
+        cancelled and their responses ignored.
+        """
+        ordered = sorted(variants, key=lambda variant: -self._variant_score(variant[0]))
+        queued = iter(ordered)
+        futures = {}
+        pending = set()
+        
+        def start_next():
+            for name, url in queued:
+                future = self.caption_executor.submit(self._probe_caption_url, name, url, referer)
+                futures[future] = name
+                pending.add(future)
+                return True
+            return False
+        
+        if self.caption_hedge_delay > 0:
+            start_next()
+        else:
+            while start_next():
+                pass
+        
+        while pending:
+            hedging = len(futures) < len(ordered)
+            done, _ = wait(pending, timeout=self.caption_hedge_delay if hedging else None, return_when=FIRST_COMPLETED)
+            pending -= done
+            
+            for future in done:
+                name = futures[future]
+                status, data = future.result()
+                self._record_variant(name, status == 'ok')
+                if status == 'ok':
+                    for other in pending:
+                        other.cancel()
+                    logger.info(f"Caption variant '{name}' won ({len(data)} bytes)")
+                    return data
+            
+            # No winner within the hedge delay, or everything in flight failed
+            if hedging:
+                start_next()
+        
+        return None
+    
+    def _probe_caption_url(self, name, url, referer):
+        """Fetch one caption URL variant; returns (status, data)"""
+        try:
+            logger.info(f"Trying caption URL variant '{name}'")
+            
+            caption_response = self.http_client.get(
+                url,
+                headers={
+                    'Referer': referer,
+                    'Accept': '*/*',
+                    'Accept-Language': 'en-US,en;q=0.9',
+                },
+                timeout=self.caption_timeout
+            )
+            
+            if caption_response.status_code != 200:
+                logger.warning(f"Variant '{name}': HTTP {caption_response.status_code}")
+                return 'failed', None
+            
+            caption_data = caption_response.content
+            if len(caption_data) <= 10:
+                logger.warning(f"Variant '{name}': Got empty response")
+                return 'failed', None
+            
+            return 'ok', caption_data
+            
+        except Exception as e:
+            logger.warning(f"Variant '{name}' error: {str(e)}")
+            return 'failed', None
+    
+    def _variant_score(self, name):
+        """Smoothed historical success rate of a caption URL variant"""
+        with self._stats_lock:
+            successes, attempts = self.caption_variant_stats.get(name, (0, 0))
+        return (successes + 1) / (attempts + 2)
+    
+    def _record_variant(self, name, success):
+        CAPTION_VARIANTS.inc(variant=name, outcome='success' if success else 'failure')
+        with self._stats_lock:
+            successes, attempts = self.caption_variant_stats.get(name, (0, 0))
+            self.caption_variant_stats[name] = (successes + int(success), attempts + 1)
+    
+    def _fetch_with_ytdlp(self, video_id, progress):
         """Fallback: Use yt-dlp with cookies"""
         try:
             import yt_dlp
             
             logger.info(f"Trying yt-dlp for {video_id}")
+            progress('fetching')
             
             ydl_opts = {
                 'skip_download': True,
@@ -211,18 +314,21 @@ class TranscriptFetcher:
                     logger.error("No json3 format found")
                     return None
                 
-                response = requests.get(json3_url, timeout=30)
-                if response.status_code != 200:
-                    logger.error(f"Failed to fetch subtitle: {response.status_code}")
-                    return None
-                
-                transcript_list = self._parse_json3_captions(response.text)
+                with self.http_client.stream('GET', json3_url, timeout=30) as response:
+                    if response.status_code != 200:
+                        logger.error(f"Failed to fetch subtitle: {response.status_code}")
+                        return None
+                    
+                    progress('parsing')
+                    entries = iter_caption_entries(response.iter_bytes())
+                    
+                    progress('chunking')
+                    with span('captions.parse_chunk'):
+                        chunks = self._create_chunks_with_timestamps(entries)
                 
-                if not transcript_list:
+                if not chunks:
                     return None
                 
-                chunks = self._create_chunks_with_timestamps(transcript_list)
-                
                 return {
                     'video_id': video_id,
                     'info': {
@@ -230,7 +336,8 @@ class TranscriptFetcher:
                         'video_url': f'https://www.youtube.com/watch?v={video_id}',
                         'transcript_type': 'yt-dlp'
                     },
-                    'chunks': chunks
+                    'chunks': chunks,
+                    'lexical_index': BM25Index([chunk['text'] for chunk in chunks])
                 }
                 
         except ImportError:
@@ -240,34 +347,99 @@ class TranscriptFetcher:
             logger.error(f"yt-dlp error: {str(e)}")
             raise
     
-    def _extract_caption_url(self, html, video_id):
-        """Extract caption URL from page HTML"""
+    def get_watch_page(self, video_id):
+        """Fetch and parse the watch page once, reusing recent results.
+
+        Availability checks, caption-track discovery and metadata all read
+        from the parsed page, which is cached per video id for
+        WATCH_PAGE_CACHE_TTL seconds. Failed fetches are not cached.
+        """
+        cached = self.watch_page_cache.get(video_id)
+        if cached is not None:
+            return cached
+        
+        video_url = f'{self.youtube_base_url}/watch?v={video_id}'
+        logger.info("Fetching video page...")
+        with span('youtube.watch_page'):
+            response = self.http_client.get(video_url, timeout=30)
+        
+        if response.status_code != 200:
+            return {'error': f'HTTP {response.status_code}'}
+        
+        html = response.text
+        logger.info(f"Got video page ({len(html)} bytes)")
+        
+        player_response = self._extract_player_response(html)
+        caption_tracks = self._get_caption_tracks(player_response)
+        
+        page = {
+            'video_id': video_id,
+            'player_response': {
+                key: player_response[key]
+                for key in ('captions', 'videoDetails', 'playabilityStatus')
+                if key in player_response
+            } if player_response else None,
+            'has_captions': '"captions"' in html or 'captionTracks' in html,
+            'languages': [track.get('languageCode') for track in caption_tracks if track.get('languageCode')],
+            'caption_url': self._extract_caption_url(html, video_id, player_response),
+            'metadata': self._extract_metadata(player_response)
+        }
+        
+        self.watch_page_cache.set(video_id, page)
+        return page
+    
+    def _extract_player_response(self, html):
+        """Parse ytInitialPlayerResponse from page HTML"""
+        match = re.search(r'ytInitialPlayerResponse\s*=\s*({.+?});', html)
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except json.JSONDecodeError as e:
+                logger.debug(f"JSON parse error: {e}")
+        return None
+    
+    def _get_caption_tracks(self, player_response):
+        if not player_response:
+            return []
+        captions = player_response.get('captions', {})
+        player_captions = captions.get('playerCaptionsTracklistRenderer', {})
+        return player_captions.get('captionTracks', [])
+    
+    def _extract_metadata(self, player_response):
+        """Extract title, author and length from the player response"""
+        details = (player_response or {}).get('videoDetails', {})
+        metadata = {}
+        
+        if details.get('title'):
+            metadata['title'] = details['title']
+        if details.get('author'):
+            metadata['author'] = details['author']
+        if details.get('lengthSeconds'):
+            try:
+                metadata['length_seconds'] = int(details['lengthSeconds'])
+            except (TypeError, ValueError):
+                pass
+        
+        return metadata
+    
+    def _extract_caption_url(self, html, video_id, player_response=None):
+        """Extract caption URL from the parsed player response, falling back to the page HTML"""
         try:
-            match = re.search(r'ytInitialPlayerResponse\s*=\s*({.+?});', html)
-            if match:
-                try:
-                    player_response = json.loads(match.group(1))
-                    
-                    captions = player_response.get('captions', {})
-                    player_captions = captions.get('playerCaptionsTracklistRenderer', {})
-                    caption_tracks = player_captions.get('captionTracks', [])
-                    
-                    for track in caption_tracks:
-                        lang = track.get('languageCode', '')
-                        if 'en' in lang.lower():
-                            base_url = track.get('baseUrl')
-                            if base_url:
-                                logger.info(f"Found caption track: {lang}")
-                                return base_url
-                    
-                    if caption_tracks:
-                        base_url = caption_tracks[0].get('baseUrl')
-                        if base_url:
-                            logger.info("Using first available caption track")
-                            return base_url
-                    
-                except json.JSONDecodeError as e:
-                    logger.debug(f"JSON parse error: {e}")
+            caption_tracks = self._get_caption_tracks(player_response)
+            
+            for track in caption_tracks:
+                lang = track.get('languageCode', '')
+                if 'en' in lang.lower():
+                    base_url = track.get('baseUrl')
+                    if base_url:
+                        logger.info(f"Found caption track: {lang}")
+                        return base_url
+            
+            if caption_tracks:
+                base_url = caption_tracks[0].get('baseUrl')
+                if base_url:
+                    logger.info("Using first available caption track")
+                    return base_url
             
             caption_match = re.search(r'"captionTracks":\s*\[([^\]]+)\]', html)
             if caption_match:
@@ -298,124 +470,78 @@ class TranscriptFetcher:
             logger.error(f"Error extracting caption URL: {str(e)}")
             return None
     
-    def _parse_json3_captions(self, data):
-        """Parse JSON3 format captions"""
-        try:
-            if not data.strip().startswith('{'):
-                return self._parse_xml_captions(data)
-            
-            caption_json = json.loads(data)
-            transcript_list = []
-            
-            events = caption_json.get('events', [])
-            
-            for event in events:
-                segs = event.get('segs')
-                if not segs:
-                    continue
-                
-                start_time = event.get('tStartMs', 0) / 1000.0
-                duration = event.get('dDurationMs', 0) / 1000.0
-                text = ''.join([seg.get('utf8', '') for seg in segs]).strip()
-                
-                if text:
-                    transcript_list.append({
-                        'text': text,
-                        'start': start_time,
-                        'duration': duration
-                    })
-            
-            return transcript_list
-            
-        except json.JSONDecodeError:
-            return self._parse_xml_captions(data)
-        except Exception as e:
-            logger.error(f"JSON3 parse error: {str(e)}")
-            return []
-    
-    def _parse_xml_captions(self, data):
-        """Parse XML format captions"""
-        try:
-            if not data.strip().startswith('<'):
-                logger.error("Data doesn't look like XML")
-                return []
-            
-            root = ET.fromstring(data)
-            transcript_list = []
-            
-            for text_elem in root.findall('.//text'):
-                start = float(text_elem.get('start', 0))
-                duration = float(text_elem.get('dur', 0))
-                text = text_elem.text or ''
-                
-                text = text.replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
-                text = text.replace('&#39;', "'").replace('&quot;', '"')
-                text = re.sub(r'<[^>]+>', '', text)
-                text = text.strip()
-                
-                if text:
-                    transcript_list.append({
-                        'text': text,
-                        'start': start,
-                        'duration': duration
-                    })
-            
-            return transcript_list
-            
-        except ET.ParseError as e:
-            logger.error(f"XML parse error: {str(e)}")
-            return []
-        except Exception as e:
-            logger.error(f"Error parsing XML: {str(e)}")
-            return []
-    
-    def _create_chunks_with_timestamps(self, transcript_list):
-        """Create chunks with timestamps"""
+    def _create_chunks_with_timestamps(self, transcript_entries):
+        """Create chunks with timestamps from an iterable of caption entries.
+
+        Entries are consumed one at a time, so a streaming parser can feed
+        them straight in without building the full transcript list. Only
+        the open chunk's entries are kept, with their start times as a
+        sorted array: the overlap carried into the next chunk is found by
+        bisecting for exactly the last ``chunk_overlap`` seconds, however
+        dense the captions, and each chunk's text is joined once when it
+        closes, so the whole pass is linear in the number of entries.
+
+        Snapping is opt-in: with ``chunk_snap_slack`` set, a chunk that has
+        reached ``chunk_duration`` stays open for up to that many extra
+        seconds until an entry ends a sentence or is followed by a pause,
+        and the overlap is moved back to a sentence start when one lies at
+        most another ``chunk_overlap`` seconds earlier.
+        """
         chunks = []
-        current_chunk = {'text': '', 'start': 0, 'end': 0, 'duration': 0}
+        starts = []
+        texts = []
+        end = 0
+        count = 0
+        # An overlap as long as the chunk would close every chunk on its next entry
+        overlap = min(self.chunk_overlap, self.chunk_duration / 2)
         
-        for i, entry in enumerate(transcript_list):
-            text = entry['text']
+        for entry in transcript_entries:
+            count += 1
             start = entry['start']
-            duration = entry['duration']
-            
-            if not current_chunk['text']:
-                current_chunk['start'] = start
-                current_chunk['text'] = text
-                current_chunk['end'] = start + duration
-            else:
-                chunk_duration = current_chunk['end'] - current_chunk['start']
-                
-                if chunk_duration >= self.chunk_duration:
-                    current_chunk['duration'] = current_chunk['end'] - current_chunk['start']
-                    chunks.append(current_chunk.copy())
-                    
-                    overlap_start = current_chunk['end'] - self.chunk_overlap
-                    overlap_text = self._get_overlap_text(transcript_list, i, overlap_start)
-                    
-                    current_chunk = {
-                        'text': overlap_text + ' ' + text if overlap_text else text,
-                        'start': overlap_start if overlap_text else start,
-                        'end': start + duration
-                    }
-                else:
-                    current_chunk['text'] += ' ' + text
-                    current_chunk['end'] = start + duration
+            
+            if texts and self._at_chunk_boundary(starts[0], end, texts[-1], start):
+                chunks.append(self._make_chunk(starts, texts, end))
+                keep = self._overlap_index(starts, texts, end, overlap)
+                starts = starts[keep:]
+                texts = texts[keep:]
+            
+            starts.append(start)
+            texts.append(entry['text'])
+            end = start + entry['duration']
         
-        if current_chunk['text']:
-            current_chunk['duration'] = current_chunk['end'] - current_chunk['start']
-            chunks.append(current_chunk)
+        if texts:
+            chunks.append(self._make_chunk(starts, texts, end))
         
-        logger.info(f"Created {len(chunks)} chunks")
+        logger.info(f"Created {len(chunks)} chunks from {count} transcript entries")
         return chunks
     
-    def _get_overlap_text(self, transcript_list, current_index, overlap_start):
-        """Get overlap text"""
-        overlap_text = ''
-        for j in range(max(0, current_index - 5), current_index):
-            if transcript_list[j]['start'] >= overlap_start:
-                overlap_text += transcript_list[j]['text'] + ' '
-        return overlap_text.strip()
+    def _at_chunk_boundary(self, chunk_start, chunk_end, last_text, next_start):
+        """Whether the open chunk should close before the next entry"""
+        duration = chunk_end - chunk_start
+        if duration < self.chunk_duration:
+            return False
+        if self.chunk_snap_slack <= 0 or duration >= self.chunk_duration + self.chunk_snap_slack:
+            return True
+        return next_start - chunk_end >= self.chunk_pause_gap or self._ends_sentence(last_text)
+    
+    def _overlap_index(self, starts, texts, end, overlap):
+        """Index of the first entry of the closed chunk to repeat in the next one"""
+        index = bisect.bisect_left(starts, end - overlap)
+        if self.chunk_snap_slack > 0:
+            reach = min(self.chunk_snap_slack, overlap)
+            lowest = max(1, bisect.bisect_left(starts, end - overlap - reach))
+            for candidate in range(index, lowest - 1, -1):
+                if self._ends_sentence(texts[candidate - 1]):
+                    return candidate
+        return index
+    
+    @staticmethod
+    def _ends_sentence(text):
+        return SENTENCE_END_PATTERN.search(text) is not None
+    
+    @staticmethod
+    def _make_chunk(starts, texts, end):
+        return {'text': ' '.join(texts), 'start': starts[0], 'end': end, 'duration': end - starts[0]}
     
     def format_timestamp(self, seconds):
         """Format timestamp"""
@@ -431,19 +557,18 @@ class TranscriptFetcher:
     def check_transcript_availability(self, video_id):
         """Check transcript availability"""
         try:
-            video_url = f'https://www.youtube.com/watch?v={video_id}'
-            response = self.session.get(video_url, timeout=15)
+            page = self.get_watch_page(video_id)
             
-            if response.status_code == 200:
-                html = response.text
-                has_captions = '"captions"' in html or 'captionTracks' in html
-                
-                return {
-                    'available': has_captions,
-                    'languages': ['en'] if has_captions else []
-                }
+            if page.get('error'):
+                return {'available': False, 'error': page['error']}
             
-            return {'available': False, 'error': f'HTTP {response.status_code}'}
+            has_captions = page['has_captions']
+            
+            return {
+                'available': has_captions,
+                'languages': (page['languages'] or ['en']) if has_captions else [],
+                'metadata': page['metadata']
+            }
             
         except Exception as e:
             return {'available': False, 'error': str(e)}
\ No newline at end of file
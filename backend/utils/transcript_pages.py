@@ -0,0 +1,124 @@
+import gzip
+import json
+import bisect
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+class TranscriptPages:
+    """Pre-serialized, paginated view of one video's transcript.
+
+    Chunks are ordered by start time and kept as a sorted ``starts`` array
+    plus a running maximum of their end times, so a time range maps to a
+    slice of chunks with two bisects. Every chunk is serialized to JSON
+    once, when the view is built; a page is the join of its slice, framed
+    by the shared video info. ``version`` hashes all of it, so pages of an
+    unchanged transcript keep their ETags across requests and processes.
+    """
+
+    def __init__(self, video_id, record, revision=None):
+        self.video_id = video_id
+        # The store's revision of the record, not the record itself, so a
+        # cached view does not keep an evicted video in memory
+        self.revision = revision
+
+        chunks = sorted(record['chunks'], key=lambda chunk: chunk['start'])
+        self.starts = [chunk['start'] for chunk in chunks]
+        self.max_ends = []
+        latest = float('-inf')
+        for chunk in chunks:
+            latest = max(latest, chunk['start'] + chunk['duration'])
+            self.max_ends.append(latest)
+
+        self.items = [_dumps({
+            'text': chunk['text'],
+            'start': chunk['start'],
+            'duration': chunk['duration']
+        }) for chunk in chunks]
+        self.video_info = _dumps(record['info'])
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(video_id.encode('utf-8'))
+        digest.update(self.video_info)
+        for item in self.items:
+            digest.update(b'\x00')
+            digest.update(item)
+        self.version = digest.hexdigest()
+
+    def __len__(self):
+        return len(self.items)
+
+    def page(self, cursor=0, limit=None, start=None, end=None):
+        """Chunk slice ``(first, last, next_cursor)`` for a cursor and optional time range.
+
+        The range keeps chunks that overlap ``[start, end)`` seconds;
+        ``cursor`` is a chunk position from a previous page's
+        ``next_cursor`` and wins when it lies past the start of the range.
+        """
+        first = 0 if start is None else bisect.bisect_right(self.max_ends, start)
+        last = len(self.items) if end is None else bisect.bisect_left(self.starts, end)
+
+        first = max(first, cursor)
+        stop = last if limit is None else min(last, first + limit)
+        stop = max(first, stop)
+        return first, stop, stop if stop < last else None
+
+    def render(self, first, stop, next_cursor):
+        """JSON body of a page"""
+        return b''.join((
+            b'{"video_id":', _dumps(self.video_id),
+            b',"video_info":', self.video_info,
+            b',"total":', str(len(self.items)).encode('ascii'),
+            b',"cursor":', str(first).encode('ascii'),
+            b',"next_cursor":', _dumps(next_cursor),
+            b',"transcript":[', b','.join(self.items[first:stop]), b']}'
+        ))
+
+    def etag(self, first, stop, next_cursor, encoding=None):
+        """Strong ETag of a page (unquoted), distinct for each content encoding"""
+        tag = f"{self.version}-{first}-{stop}-{'end' if next_cursor is None else next_cursor}"
+        if encoding:
+            tag += f"-{encoding}"
+        return tag
+
+
+def negotiate_encoding(accept_encoding):
+    """Preferred supported content encoding in an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        name = name.strip().lower()
+        if name:
+            accepted[name] = quality
+
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+def compress(body, encoding):
+    """Compress a response body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
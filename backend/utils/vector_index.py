@@ -0,0 +1,349 @@
+import math
+import time
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class VectorIndex:
+    """Global approximate nearest-neighbour index over every stored chunk.
+
+    An IVF (inverted file) index in pure NumPy: vectors are partitioned into
+    ``nlist`` clusters by spherical k-means and a query only scores the
+    vectors of its ``nprobe`` closest clusters. Until ``train_size`` vectors
+    have been added the index searches exhaustively; it trains itself once that
+    size is reached and retrains whenever it has grown ``retrain_factor``
+    times since. Training runs on a background thread; searches keep using
+    the previous lists (or an exhaustive scan) until it is swapped in.
+    Removed and replaced videos leave tombstoned rows behind, which count
+    towards that growth and are dropped when the index retrains.
+    Videos can be added incrementally and searches can be
+    restricted to a set of video ids (those are scored exactly, since a
+    video's rows are contiguous). Vectors are kept as float16 to halve memory
+    and converted to float32 only for the rows being scored.
+    """
+
+    def __init__(self, nprobe=8, train_size=4096, retrain_factor=4, max_nlist=4096):
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.retrain_factor = retrain_factor
+        self.max_nlist = max_nlist
+
+        self.dim = None
+        self._vectors = None
+        self._row_video = np.zeros(0, dtype=np.int32)
+        self._row_chunk = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+
+        self._video_codes = {}
+        self._video_names = []
+        self._video_rows = {}
+
+        self._centroids = None
+        self._lists = []
+        self._trained_size = 0
+        self._training = False
+        self._trainer = None
+
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return int(self._alive[:self._size].sum())
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return video_id in self._video_rows
+
+    def add(self, video_id, embeddings):
+        """Add (or replace) the chunk embeddings of a video"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) == 0:
+            return
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+            elif embeddings.shape[1] != self.dim:
+                logger.warning(
+                    f"Not indexing {video_id}: dimension {embeddings.shape[1]} does not match index dimension {self.dim}"
+                )
+                return
+
+            if video_id in self._video_rows:
+                self._remove_locked(video_id)
+
+            code = self._video_codes.get(video_id)
+            if code is None:
+                code = len(self._video_names)
+                self._video_codes[video_id] = code
+                self._video_names.append(video_id)
+
+            start = self._size
+            end = start + len(embeddings)
+            self._reserve(end)
+
+            self._vectors[start:end] = embeddings
+            self._row_video[start:end] = code
+            self._row_chunk[start:end] = np.arange(len(embeddings), dtype=np.int32)
+            self._alive[start:end] = True
+            self._size = end
+            self._video_rows[video_id] = (start, end)
+
+            if self._centroids is not None:
+                self._assign(start, end)
+
+            if not self._training and self._needs_training():
+                self._start_training()
+
+    def wait_for_training(self, timeout=None):
+        """Block until a background retraining, if any, has been swapped in"""
+        trainer = self._trainer
+        while trainer is not None:
+            trainer.join(timeout)
+            if trainer.is_alive() or self._trainer is trainer:
+                return
+            trainer = self._trainer
+
+    def remove(self, video_id):
+        """Remove a video's vectors from search results"""
+        with self._lock:
+            self._remove_locked(video_id)
+
+    def search(self, query, top_k=10, video_ids=None, nprobe=None):
+        """Return [(video_id, chunk_index, similarity), ...] best first"""
+        query = np.asarray(query, dtype=np.float32)
+
+        with self._lock:
+            if self._size == 0 or query.shape[-1] != self.dim:
+                return []
+
+            if video_ids is not None:
+                ranges = [self._video_rows[video_id] for video_id in video_ids if video_id in self._video_rows]
+                if not ranges:
+                    return []
+                candidates = np.concatenate([np.arange(start, end) for start, end in ranges])
+            elif self._centroids is None:
+                candidates = None
+            else:
+                probes = min(nprobe or self.nprobe, len(self._centroids))
+                centroid_scores = self._centroids @ query
+                nearest = np.argpartition(centroid_scores, -probes)[-probes:]
+                candidates = np.concatenate([self._list_rows(list_id) for list_id in nearest])
+
+            if candidates is None:
+                rows = np.flatnonzero(self._alive[:self._size])
+            else:
+                rows = candidates[self._alive[candidates]]
+            scores = self._vectors[rows].astype(np.float32) @ query
+
+            if len(rows) == 0:
+                return []
+
+            k = min(top_k, len(rows))
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+
+            return [
+                (self._video_names[self._row_video[rows[i]]], int(self._row_chunk[rows[i]]), float(scores[i]))
+                for i in top
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'vectors': len(self),
+                'videos': len(self._video_rows),
+                'trained': self._centroids is not None,
+                'training': self._training,
+                'nlist': 0 if self._centroids is None else len(self._centroids),
+                'nprobe': self.nprobe,
+                'bytes': 0 if self._vectors is None else int(self._vectors[:self._size].nbytes)
+            }
+
+    def _remove_locked(self, video_id):
+        rows = self._video_rows.pop(video_id, None)
+        if rows is not None:
+            self._alive[rows[0]:rows[1]] = False
+
+    def _reserve(self, size):
+        capacity = 0 if self._vectors is None else len(self._vectors)
+        if size <= capacity:
+            return
+
+        new_capacity = max(size, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float16)
+        row_video = np.zeros(new_capacity, dtype=np.int32)
+        row_chunk = np.zeros(new_capacity, dtype=np.int32)
+        alive = np.zeros(new_capacity, dtype=bool)
+
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            row_video[:self._size] = self._row_video[:self._size]
+            row_chunk[:self._size] = self._row_chunk[:self._size]
+            alive[:self._size] = self._alive[:self._size]
+
+        self._vectors = vectors
+        self._row_video = row_video
+        self._row_chunk = row_chunk
+        self._alive = alive
+
+    def _needs_training(self):
+        if self._size < self.train_size:
+            return False
+        if self._centroids is None:
+            return True
+        return self._size >= self._trained_size * self.retrain_factor
+
+    def _start_training(self):
+        """Retrain on a background thread from a snapshot of the rows added so far.
+
+        Written rows never change and a grown array is a new object, so the
+        snapshot arrays can be read without the lock while adds, removals and
+        searches carry on against the current lists.
+        """
+        self._training = True
+        snapshot = (
+            self._vectors, self._row_video, self._row_chunk, self._size,
+            np.flatnonzero(self._alive[:self._size])
+        )
+        self._trainer = threading.Thread(
+            target=self._train, args=snapshot, name='vector-index-train', daemon=True
+        )
+        self._trainer.start()
+
+    def _train(self, vectors, row_video, row_chunk, size, live):
+        """Compact and cluster a snapshot without holding the lock, then swap the result in"""
+        try:
+            started = time.perf_counter()
+            built = self._build(vectors, row_video, row_chunk, live)
+        except Exception as e:
+            logger.error(f"Vector index training failed: {str(e)}", exc_info=True)
+            with self._lock:
+                self._training = False
+            return
+
+        with self._lock:
+            self._swap(built, size, live)
+            self._training = False
+            logger.info(
+                f"Trained vector index: {len(self._lists)} lists over {self._size} vectors, "
+                f"dropped {size - len(live)} removed vectors in {time.perf_counter() - started:.2f}s"
+            )
+            if self._needs_training():
+                self._start_training()
+
+    def _build(self, vectors, row_video, row_chunk, live):
+        """Compacted copies of the live snapshot rows plus, if there are enough, their clustering"""
+        count = len(live)
+        capacity = max(2 * count, 1024)
+        built = {
+            'vectors': np.zeros((capacity, self.dim), dtype=np.float16),
+            'row_video': np.zeros(capacity, dtype=np.int32),
+            'row_chunk': np.zeros(capacity, dtype=np.int32),
+            'centroids': None,
+            'lists': []
+        }
+        built['vectors'][:count] = vectors[live]
+        built['row_video'][:count] = row_video[live]
+        built['row_chunk'][:count] = row_chunk[live]
+
+        if count < self.train_size:
+            # Mostly removed rows: search exhaustively until the index has grown again
+            return built
+
+        nlist = min(self.max_nlist, max(1, int(4 * math.sqrt(count))), count)
+
+        rng = np.random.default_rng(0)
+        sample_size = min(count, nlist * 32)
+        sample = built['vectors'][rng.choice(count, sample_size, replace=False)].astype(np.float32)
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(8):
+            assignments = self._nearest_centroid(sample, centroids)
+            counts = np.bincount(assignments, minlength=nlist)
+            order = np.argsort(assignments, kind='stable')
+            sums = np.zeros_like(centroids)
+            present = np.flatnonzero(counts)
+            sums[present] = np.add.reduceat(sample[order], np.cumsum(counts)[present] - counts[present])
+
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        built['centroids'] = centroids.astype(np.float32)
+        built['lists'] = [[] for _ in range(nlist)]
+        self._assign_rows(built['vectors'], built['centroids'], built['lists'], 0, count)
+        return built
+
+    def _swap(self, built, size, live):
+        """Install a built index, carrying over removals and rows added since the snapshot"""
+        count = len(live)
+        total = count + self._size - size
+
+        vectors, row_video, row_chunk = built['vectors'], built['row_video'], built['row_chunk']
+        if total > len(vectors):
+            capacity = 2 * total
+            vectors = np.concatenate([vectors[:count], np.zeros((capacity - count, self.dim), dtype=np.float16)])
+            row_video = np.concatenate([row_video[:count], np.zeros(capacity - count, dtype=np.int32)])
+            row_chunk = np.concatenate([row_chunk[:count], np.zeros(capacity - count, dtype=np.int32)])
+        vectors[count:total] = self._vectors[size:self._size]
+        row_video[count:total] = self._row_video[size:self._size]
+        row_chunk[count:total] = self._row_chunk[size:self._size]
+
+        alive = np.zeros(len(vectors), dtype=bool)
+        alive[:count] = self._alive[live]
+        alive[count:total] = self._alive[size:self._size]
+
+        for video_id, (start, end) in self._video_rows.items():
+            new_start = int(np.searchsorted(live, start)) if start < size else count + start - size
+            self._video_rows[video_id] = (new_start, new_start + end - start)
+
+        self._vectors = vectors
+        self._row_video = row_video
+        self._row_chunk = row_chunk
+        self._alive = alive
+        self._size = total
+        self._centroids = built['centroids']
+        self._lists = built['lists']
+        self._trained_size = total if self._centroids is not None else 0
+
+        if self._centroids is not None and total > count:
+            self._assign(count, total)
+
+    def _assign(self, start, end):
+        """Append rows [start, end) to the inverted list of their nearest centroid"""
+        self._assign_rows(self._vectors, self._centroids, self._lists, start, end)
+
+    @classmethod
+    def _assign_rows(cls, vectors, centroids, lists, start, end):
+        for block_start in range(start, end, 65536):
+            block_end = min(block_start + 65536, end)
+            assignments = cls._nearest_centroid(vectors[block_start:block_end].astype(np.float32), centroids)
+            order = np.argsort(assignments, kind='stable')
+            boundaries = np.flatnonzero(np.diff(assignments[order])) + 1
+            for group in np.split(order, boundaries):
+                if len(group):
+                    lists[assignments[group[0]]].append(group + block_start)
+
+    def _list_rows(self, list_id):
+        """Row ids of an inverted list, compacting appended segments on first use"""
+        segments = self._lists[list_id]
+        if not segments:
+            return np.zeros(0, dtype=np.int64)
+        if len(segments) > 1:
+            segments[:] = [np.concatenate(segments)]
+        return segments[0]
+
+    @staticmethod
+    def _nearest_centroid(vectors, centroids):
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), 8192):
+            block = vectors[start:start + 8192]
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
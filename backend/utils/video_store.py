@@ -0,0 +1,348 @@
+import os
+import re
+import json
+import errno
+import atexit
+import shutil
+import tempfile
+import itertools
+import threading
+import logging
+import numpy as np
+from collections import OrderedDict
+from .lexical_index import BM25Index
+from .quantization import QuantizedEmbeddings, STORAGE_MODES
+
+logger = logging.getLogger(__name__)
+
+# Rough per-chunk cost of the chunk dict itself, on top of its text
+CHUNK_OVERHEAD_BYTES = 400
+
+class VideoStore:
+    """Video records ('info', 'chunks', 'embeddings', 'lexical_index') with optional persistence.
+
+    With a directory, records are saved under ``<directory>/<video_id>/`` and
+    memory-mapped back, so worker processes share embedding pages and see
+    each other's writes. ``storage`` selects float16/int8 resident embeddings
+    and ``memory_budget`` evicts (spilling if needed) the least recently
+    queried videos.
+    """
+
+    VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+    META_FILE = 'meta.json'
+    EMBEDDINGS_FILE = 'embeddings.npy'
+    QUANTIZED_FILE = 'embeddings.{storage}.npy'
+    SCALES_FILE = 'embedding_scales.npy'
+
+    def __init__(self, directory=None, storage='float32', memory_budget=None, spill_directory=None):
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Unknown embedding storage '{storage}', expected one of {', '.join(STORAGE_MODES)}")
+
+        self.directory = directory or None
+        self.storage = storage
+        self.memory_budget = memory_budget or None
+        self.spill_directory = spill_directory or None
+        self._records = OrderedDict()
+        self._signatures = {}
+        self._footprints = {}
+        self._resident_bytes = 0
+        self._evicting = {}
+        self._spilled = set()
+        self._revisions = {}
+        self._revision_counter = itertools.count(1)
+        self._lock = threading.RLock()
+
+        self.evictions = 0
+        self.spills = 0
+        self.loads = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            logger.info(f"Video store persisting to {self.directory}")
+
+    def __contains__(self, video_id):
+        with self._lock:
+            if video_id in self._records or video_id in self._evicting or video_id in self._spilled:
+                return True
+        return self._has_on_disk(video_id)
+
+    def __getitem__(self, video_id):
+        record = self.get(video_id)
+        if record is None:
+            raise KeyError(video_id)
+        return record
+
+    def __setitem__(self, video_id, record):
+        self.put(video_id, record)
+
+    def __len__(self):
+        return len(self.video_ids())
+
+    def get(self, video_id, default=None):
+        """Get a video record, loading it from disk if it was evicted or rewritten by another process"""
+        signature = self.signature(video_id)
+        with self._lock:
+            record = self._records.get(video_id)
+            if record is not None and (signature is None or self._signatures.get(video_id) == signature):
+                self._records.move_to_end(video_id)
+                return record
+            if record is None and video_id in self._evicting:
+                return self._evicting[video_id]
+            spilled = video_id in self._spilled
+
+        if signature is not None:
+            record = self._load(video_id)
+        elif spilled:
+            record = self._load(video_id, directory=self.spill_directory)
+
+        if record is None:
+            return default
+
+        with self._lock:
+            self.loads += 1
+        return self._admit(video_id, record, signature)
+
+    def put(self, video_id, record):
+        """Store a video record and persist it when a directory is configured"""
+        signature = None
+        if self._persistable(video_id):
+            self._save(video_id, record)
+            record = self._load(video_id, record.get('lexical_index')) or record
+            signature = self.signature(video_id)
+        elif self.storage != 'float32' and not isinstance(record['embeddings'], QuantizedEmbeddings):
+            record = dict(record, embeddings=QuantizedEmbeddings.quantize(record['embeddings'], self.storage))
+
+        with self._lock:
+            self._spilled.discard(video_id)
+            self._revisions[video_id] = next(self._revision_counter)
+        self._admit(video_id, record, signature)
+
+    def video_ids(self):
+        """List ids of all stored videos"""
+        with self._lock:
+            ids = set(self._records) | set(self._evicting) | self._spilled
+
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if self._has_on_disk(name):
+                    ids.add(name)
+
+        return sorted(ids)
+
+    def signature(self, video_id):
+        """Identity of a video's files on disk, which changes whenever the video is rewritten"""
+        if not self._persistable(video_id):
+            return None
+        try:
+            stat = os.stat(os.path.join(self._video_dir(video_id), self.META_FILE))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def revision(self, video_id):
+        """Changes whenever a video's record is replaced, but not when it is evicted and reloaded"""
+        with self._lock:
+            revision = self._revisions.get(video_id)
+        return (self.signature(video_id), revision)
+
+    def version(self):
+        """Changes whenever any process adds or rewrites a video in the store directory"""
+        if not self.directory:
+            return None
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def stats(self):
+        """Loaded videos, their memory footprint against the budget, and eviction counts"""
+        with self._lock:
+            records = list(self._records.values())
+            resident_bytes = self._resident_bytes
+            spilled = len(self._spilled)
+
+        return {
+            'storage': self.storage,
+            'videos_loaded': len(records),
+            'embedding_bytes': int(sum(record['embeddings'].nbytes for record in records)),
+            'resident_bytes': resident_bytes,
+            'memory_budget': self.memory_budget,
+            'evictions': self.evictions,
+            'spills': self.spills,
+            'videos_spilled': spilled,
+            'loads': self.loads
+        }
+
+    def _admit(self, video_id, record, signature):
+        """Make a record resident, then evict the least recently used ones beyond the memory budget"""
+        footprint = self._footprint(record)
+        victims = []
+
+        with self._lock:
+            self._resident_bytes += footprint - self._footprints.get(video_id, 0)
+            self._records[video_id] = record
+            self._records.move_to_end(video_id)
+            self._footprints[video_id] = footprint
+            self._signatures[video_id] = signature
+
+            while self.memory_budget and self._resident_bytes > self.memory_budget and len(self._records) > 1:
+                victim_id, victim = self._records.popitem(last=False)
+                self._resident_bytes -= self._footprints.pop(victim_id, 0)
+                persisted = self._signatures.pop(victim_id, None) is not None
+                self.evictions += 1
+                if not persisted and victim_id not in self._spilled:
+                    self._evicting[victim_id] = victim
+                    victims.append((victim_id, victim))
+
+        if victims:
+            logger.info(f"Evicting {len(victims)} videos to stay within the {self.memory_budget} byte budget")
+        for victim_id, victim in victims:
+            self._spill(victim_id, victim)
+        return record
+
+    def _spill(self, video_id, record):
+        """Write an evicted in-memory record to the spill directory so it reloads without re-embedding"""
+        try:
+            if not self.VIDEO_ID_PATTERN.match(video_id):
+                raise ValueError("invalid video id")
+            self._save(video_id, record, self._spill_directory())
+            with self._lock:
+                self._spilled.add(video_id)
+                self.spills += 1
+        except Exception as e:
+            logger.error(f"Could not spill video {video_id}, it will need processing again: {str(e)}")
+        finally:
+            with self._lock:
+                self._evicting.pop(video_id, None)
+
+    def _spill_directory(self):
+        with self._lock:
+            if self.spill_directory is None:
+                self.spill_directory = tempfile.mkdtemp(prefix='video-store-spill-')
+                owner = os.getpid()
+                atexit.register(lambda: os.getpid() == owner and shutil.rmtree(self.spill_directory, ignore_errors=True))
+            else:
+                os.makedirs(self.spill_directory, exist_ok=True)
+            return self.spill_directory
+
+    @staticmethod
+    def _footprint(record):
+        """Approximate bytes a record holds: embeddings, chunk texts and the BM25 index"""
+        chunks = record['chunks']
+        lexical_index = record.get('lexical_index')
+        return int(
+            record['embeddings'].nbytes
+            + sum(len(chunk['text']) for chunk in chunks)
+            + CHUNK_OVERHEAD_BYTES * len(chunks)
+            + (lexical_index.nbytes if lexical_index is not None else 0)
+        )
+
+    def _video_dir(self, video_id, directory=None):
+        return os.path.join(directory or self.directory, video_id)
+
+    def _persistable(self, video_id):
+        return bool(self.directory) and bool(self.VIDEO_ID_PATTERN.match(video_id))
+
+    def _has_on_disk(self, video_id, directory=None):
+        if directory is None and not self._persistable(video_id):
+            return False
+        return os.path.isfile(os.path.join(self._video_dir(video_id, directory), self.META_FILE))
+
+    def _save(self, video_id, record, directory=None):
+        """Write a record atomically: build it in a temp dir, then rename into place.
+
+        A previous version is renamed aside first and only deleted once the
+        new one is in place, so a failed save leaves it intact. If another
+        process moves its own copy into place first, that copy wins.
+        """
+        directory = directory or self.directory
+        embeddings = record['embeddings']
+        if isinstance(embeddings, QuantizedEmbeddings) and embeddings.full is not None:
+            embeddings = embeddings.full
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        meta = {
+            'info': record['info'],
+            'chunks': record['chunks']
+        }
+
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{video_id}-', dir=directory)
+        try:
+            np.save(os.path.join(tmp_dir, self.EMBEDDINGS_FILE), embeddings)
+            if self.storage != 'float32':
+                self._save_quantized(tmp_dir, QuantizedEmbeddings.quantize(embeddings, self.storage))
+            with open(os.path.join(tmp_dir, self.META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, separators=(',', ':'))
+
+            target = self._video_dir(video_id, directory)
+            old_dir = None
+            if os.path.isdir(target):
+                old_dir = f"{tmp_dir}-old"
+                try:
+                    os.replace(target, old_dir)
+                except FileNotFoundError:
+                    old_dir = None
+            try:
+                os.replace(tmp_dir, target)
+            except OSError as e:
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    if old_dir is not None:
+                        os.replace(old_dir, target)
+                    raise
+                # A concurrent writer renamed its copy into place after ours was moved aside
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                if old_dir is not None:
+                    shutil.rmtree(old_dir, ignore_errors=True)
+                logger.info(f"Video {video_id} was persisted concurrently by another writer, keeping its copy")
+                return
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if old_dir is not None:
+            # Open memory maps of the old files stay valid after the unlink
+            shutil.rmtree(old_dir, ignore_errors=True)
+        logger.info(f"Persisted video {video_id} ({embeddings.nbytes} bytes of embeddings)")
+
+    def _load(self, video_id, lexical_index=None, directory=None):
+        """Load a record from disk with memory-mapped embeddings"""
+        if not self._has_on_disk(video_id, directory):
+            return None
+
+        video_dir = self._video_dir(video_id, directory)
+        try:
+            with open(os.path.join(video_dir, self.META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            embeddings = np.load(os.path.join(video_dir, self.EMBEDDINGS_FILE), mmap_mode='r')
+            if self.storage != 'float32':
+                embeddings = self._load_quantized(video_dir, embeddings)
+
+            return {
+                'info': meta['info'],
+                'chunks': meta['chunks'],
+                'embeddings': embeddings,
+                'lexical_index': lexical_index or BM25Index([chunk['text'] for chunk in meta['chunks']])
+            }
+
+        except Exception as e:
+            logger.error(f"Error loading video {video_id} from disk: {str(e)}")
+            return None
+
+    def _save_quantized(self, video_dir, quantized):
+        np.save(os.path.join(video_dir, self.QUANTIZED_FILE.format(storage=self.storage)), quantized.codes)
+        if quantized.scales is not None:
+            np.save(os.path.join(video_dir, self.SCALES_FILE), quantized.scales)
+
+    def _load_quantized(self, video_dir, full):
+        """Read the quantized codes into memory, quantizing videos saved in another storage mode"""
+        codes_path = os.path.join(video_dir, self.QUANTIZED_FILE.format(storage=self.storage))
+        scales_path = os.path.join(video_dir, self.SCALES_FILE)
+
+        if os.path.isfile(codes_path) and (self.storage == 'float16' or os.path.isfile(scales_path)):
+            codes = np.load(codes_path)
+            scales = np.load(scales_path) if self.storage == 'int8' else None
+            if len(codes) == len(full):
+                return QuantizedEmbeddings(codes, scales, full=full)
+
+        return QuantizedEmbeddings.quantize(full, self.storage, full=full)
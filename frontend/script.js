@@ -3,8 +3,19 @@ document.addEventListener('DOMContentLoaded', function() {
 
     const API_URL = 'http://localhost:5000';
 
+    const TRANSCRIPT_PAGE_SIZE = 50;
+
     let currentVideoId = null;
+    let chatSessionId = null;
     let ytPlayer = null;
+    
+    // Transcript pages are fetched as the panel scrolls; the browser
+    // revalidates them with their ETags, so repeat loads are 304s
+    let transcriptCursor = 0;
+    let transcriptDone = false;
+    let transcriptLoading = null;
+    let transcriptGeneration = 0;
+    let transcriptLoadedUntil = -1;
 
     const videoUrlInput = document.getElementById('videoUrlInput'); 
     const processBtn = document.getElementById('processBtn');
@@ -32,6 +43,12 @@ document.addEventListener('DOMContentLoaded', function() {
     sendBtn.addEventListener('click', sendMessage);
     clearChatBtn.addEventListener('click', clearChat);
     searchBtn.addEventListener('click', searchTranscript);
+    transcriptContent.addEventListener('scroll', () => {
+        const remaining = transcriptContent.scrollHeight - transcriptContent.scrollTop - transcriptContent.clientHeight;
+        if (remaining < 300) {
+            loadTranscriptPage();
+        }
+    });
 
     chatInput.addEventListener('keypress', (e) => {
         if (e.key === 'Enter' && !e.shiftKey) {
@@ -76,20 +93,32 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: JSON.stringify({ video_url: videoUrl })
             });
             
-            const data = await response.json();
+            let data = await response.json();
             
             if (!response.ok) {
                 throw new Error(data.error || 'Failed to process video');
             }
             
+            if (response.status === 202) {
+                data = await waitForJob(data.job_id);
+            }
+            
             console.log('Video processed:', data);
             currentVideoId = data.video_id;
+            chatSessionId = null;
             
-            showStatus(`Video processed successfully! ${data.chunks_count} chunks created.`, 'success');
+            if (data.chunks_count !== undefined) {
+                showStatus(`Video processed successfully! ${data.chunks_count} chunks created.`, 'success');
+            } else {
+                showStatus('Video loaded successfully!', 'success');
+            }
             
             loadVideoPlayer(data.video_id);
             
             videoLink.href = data.video_info.video_url;
+            if (data.video_info.title) {
+                videoTitle.textContent = data.video_info.title;
+            }
             
             await loadTranscript();
             
@@ -106,6 +135,42 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    async function waitForJob(jobId) {
+        const stageLabels = {
+            queued: 'Queued...',
+            fetching: 'Fetching transcript...',
+            parsing: 'Parsing captions...',
+            chunking: 'Chunking transcript...',
+            embedding: 'Creating embeddings...',
+            storing: 'Saving...'
+        };
+        
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            
+            const response = await fetch(`${API_URL}/api/jobs/${jobId}`);
+            const job = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(job.error || 'Failed to check processing status');
+            }
+            
+            if (job.status === 'completed') {
+                return job.result;
+            }
+            
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Failed to process video');
+            }
+            
+            let label = stageLabels[job.stage] || 'Processing...';
+            if (job.stage === 'embedding' && job.progress > 0) {
+                label = `Creating embeddings ${Math.round(job.progress * 100)}%`;
+            }
+            processBtn.querySelector('.btn-text').textContent = label;
+        }
+    }
+
     function loadVideoPlayer(videoId) {
         const playerDiv = document.getElementById('videoPlayer');
         
@@ -130,14 +195,34 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     async function loadTranscript() {
-        try {
-            const response = await fetch(`${API_URL}/api/get-transcript`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ video_id: currentVideoId })
+        transcriptGeneration += 1;
+        transcriptCursor = 0;
+        transcriptDone = false;
+        transcriptLoading = null;
+        transcriptLoadedUntil = -1;
+        transcriptContent.innerHTML = '';
+        
+        await loadTranscriptPage();
+    }
+
+    function loadTranscriptPage(limit = TRANSCRIPT_PAGE_SIZE) {
+        if (transcriptDone || !currentVideoId) {
+            return Promise.resolve();
+        }
+        if (!transcriptLoading) {
+            transcriptLoading = fetchTranscriptPage(limit).finally(() => {
+                transcriptLoading = null;
             });
+        }
+        return transcriptLoading;
+    }
+
+    async function fetchTranscriptPage(limit) {
+        const generation = transcriptGeneration;
+        
+        try {
+            const params = new URLSearchParams({ cursor: transcriptCursor, limit: limit });
+            const response = await fetch(`${API_URL}/api/transcript/${encodeURIComponent(currentVideoId)}?${params}`);
             
             const data = await response.json();
             
@@ -145,17 +230,34 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(data.error || 'Failed to load transcript');
             }
             
-            displayTranscript(data.transcript);
+            if (generation !== transcriptGeneration) {
+                return;
+            }
+            
+            appendTranscript(data.transcript);
+            transcriptCursor = data.next_cursor;
+            transcriptDone = data.next_cursor === null;
             
         } catch (error) {
             console.error('Error loading transcript:', error);
-            transcriptContent.innerHTML = '<div class="error-state"><p>Failed to load transcript</p></div>';
+            if (generation === transcriptGeneration && !transcriptContent.children.length) {
+                transcriptDone = true;
+                transcriptContent.innerHTML = '<div class="error-state"><p>Failed to load transcript</p></div>';
+            }
         }
     }
 
-    function displayTranscript(transcript) {
-        transcriptContent.innerHTML = '';
-        
+    async function loadTranscriptUntil(seconds) {
+        while (!transcriptDone && transcriptLoadedUntil < seconds) {
+            const cursor = transcriptCursor;
+            await loadTranscriptPage(500);
+            if (transcriptCursor === cursor && !transcriptDone) {
+                break;
+            }
+        }
+    }
+
+    function appendTranscript(transcript) {
         transcript.forEach((item) => {
             const div = document.createElement('div');
             div.className = 'transcript-item';
@@ -165,6 +267,7 @@ document.addEventListener('DOMContentLoaded', function() {
             `;
             div.addEventListener('click', () => seekToTime(item.start));
             transcriptContent.appendChild(div);
+            transcriptLoadedUntil = Math.max(transcriptLoadedUntil, item.start);
         });
     }
 
@@ -195,7 +298,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(data.error || 'Search failed');
             }
             
-            highlightSearchResults(data.results);
+            await highlightSearchResults(data.results);
             
         } catch (error) {
             console.error('Error searching:', error);
@@ -206,7 +309,11 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    function highlightSearchResults(results) {
+    async function highlightSearchResults(results) {
+        if (results.length) {
+            await loadTranscriptUntil(Math.max(...results.map(result => result.start)));
+        }
+        
         const allItems = transcriptContent.querySelectorAll('.transcript-item');
         allItems.forEach(item => item.classList.remove('highlighted'));
         
@@ -239,26 +346,48 @@ document.addEventListener('DOMContentLoaded', function() {
         chatMessages.scrollTop = chatMessages.scrollHeight;
         
         try {
-            const response = await fetch(`${API_URL}/api/chat`, {
+            const response = await fetch(`${API_URL}/api/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
                     video_id: currentVideoId,
-                    message: message
+                    message: message,
+                    session_id: chatSessionId
                 })
             });
             
-            const data = await response.json();
-            
-            typingDiv.remove();
-            
             if (!response.ok) {
+                const data = await response.json();
                 throw new Error(data.error || 'Failed to get response');
             }
             
-            addMessage(data.response, 'bot', data.sources);
+            let answer = '';
+            let sources = null;
+            let messageDiv = null;
+            
+            await readEventStream(response, (event, data) => {
+                if (event === 'sources') {
+                    sources = data.sources;
+                    chatSessionId = data.session_id || chatSessionId;
+                } else if (event === 'delta') {
+                    answer += data.content;
+                    if (!messageDiv) {
+                        typingDiv.remove();
+                        messageDiv = addMessage(answer, 'bot', sources);
+                    } else {
+                        renderMessage(messageDiv, answer, sources);
+                    }
+                } else if (event === 'error') {
+                    throw new Error(data.error || 'Failed to get response');
+                }
+            });
+            
+            typingDiv.remove();
+            if (!messageDiv) {
+                addMessage(answer || 'Sorry, I could not generate a response.', 'bot', sources);
+            }
             
         } catch (error) {
             console.error('Error sending message:', error);
@@ -269,6 +398,37 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        event = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
+    }
+
     function addMessage(text, sender, sources = null) {
         const welcomeMsg = chatMessages.querySelector('.welcome-message');
         if (welcomeMsg) welcomeMsg.remove();
@@ -276,6 +436,14 @@ document.addEventListener('DOMContentLoaded', function() {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
         
+        renderMessage(messageDiv, text, sources);
+        
+        chatMessages.appendChild(messageDiv);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageDiv;
+    }
+
+    function renderMessage(messageDiv, text, sources = null) {
         const processedText = processTimestamps(text);
         
         let sourcesHtml = '';
@@ -300,7 +468,6 @@ document.addEventListener('DOMContentLoaded', function() {
             </div>
         `;
         
-        chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
     }
 
@@ -349,6 +516,11 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function clearChat() {
+        if (chatSessionId) {
+            fetch(`${API_URL}/api/chat/sessions/${chatSessionId}`, { method: 'DELETE' }).catch(() => {});
+            chatSessionId = null;
+        }
+        
         chatMessages.innerHTML = `
             <div class="welcome-message">
                 <h4>👋 Hello! I'm your AI assistant.</h4>
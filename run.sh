@@ -126,7 +126,13 @@ echo -e "\n${YELLOW}[5/6] Starting backend server...${NC}"
 cd backend
 
 source venv/bin/activate
-nohup python app.py > backend.log 2>&1 &
+if [ "$SERVER_MODE" = "asgi" ]; then
+    nohup uvicorn asgi:app --host 0.0.0.0 --port 5000 > backend.log 2>&1 &
+elif [ "$SERVER_MODE" = "gunicorn" ]; then
+    nohup gunicorn -c gunicorn.conf.py app:app > backend.log 2>&1 &
+else
+    nohup python app.py > backend.log 2>&1 &
+fi
 BACKEND_PID=$!
 
 sleep 2